@@ -0,0 +1,60 @@
+# ai.py
+import time
+from config import *
+from utils import distance
+
+# ==========================================
+# ENEMY AI SCHEDULER (STAGGERED DECISIONS)
+# ==========================================
+
+class AIScheduler:
+    """
+    Splits enemy AI into decisions and movement. Every enemy moves every
+    tick (Enemy.update steers towards what it last decided), but think()
+    (line of sight, boss pattern choice) only runs when the enemy is due:
+    every tick up close, every AI_MID_INTERVAL / AI_FAR_INTERVAL seconds
+    further out, where it also switches to cheap flow-field-only steering.
+    Due enemies are served round robin, at most AI_MAX_THINKS per tick and
+    within AI_BUDGET_MS; whoever misses out goes first next tick.
+    """
+
+    def __init__(self, max_thinks=AI_MAX_THINKS, budget_ms=AI_BUDGET_MS):
+        self.max_thinks = max_thinks
+        self.budget = budget_ms / 1000.0 if budget_ms is not None else None
+        self.cursor = 0
+        self.thinks = 0    # Decisions made last tick
+        self.deferred = 0  # Due decisions pushed to a later tick
+
+    def interval(self, dist):
+        if dist < AI_NEAR: return 0.0
+        if dist < AI_FAR: return AI_MID_INTERVAL
+        return AI_FAR_INTERVAL
+
+    def update(self, enemies, dt, player, grid, bullets, cam):
+        self.think(enemies, dt, player, grid)
+        for e in enemies:
+            e.update(dt, player, grid, bullets, cam)
+
+    def think(self, enemies, dt, player, grid):
+        n = len(enemies)
+        self.thinks = 0
+        self.deferred = 0
+        if not n: return
+        first = self.cursor % n
+        deadline = time.perf_counter() + self.budget if self.budget is not None else None
+        resume = None  # Where next tick's round starts if we run out
+        for k in range(n):
+            e = enemies[(first + k) % n]
+            e.think_timer -= dt
+            if e.think_timer > 0:
+                continue
+            if self.thinks >= self.max_thinks or (deadline and time.perf_counter() > deadline):
+                self.deferred += 1
+                if resume is None: resume = (first + k) % n
+                continue
+            dist = distance(e.wx, e.wy, player.wx, player.wy)
+            e.think(player, grid, dist >= AI_FAR)
+            e.think_timer = self.interval(dist)
+            self.thinks += 1
+        if resume is not None:
+            self.cursor = resume
@@ -0,0 +1,191 @@
+# batch.py
+"""
+Many headless Square Up games at once, for balance and load testing. Each
+run is benchmark.run() with the scripted bot playing for real (no god mode)
+and spending its money in the shop between waves; runs are spread over a
+multiprocessing pool and the results summed up:
+waves survived, money per wave, time to kill per enemy type and the
+distribution of tick times.
+    python batch.py                          # 100 runs, seeds 1..100, up to 10 waves
+    python batch.py --runs 1000 --jobs 8 --csv runs.csv
+Run i uses seed `--seed + i`, so a sweep (or any single run of it) repeats exactly.
+"""
+
+import argparse
+import collections
+import csv
+import multiprocessing
+import os
+import time
+
+from config import *
+import benchmark
+
+TICK_BIN_MS = 0.1  # Width of the tick time histogram bins
+
+
+# ==========================================
+# SCRIPTED SHOPPER
+# ==========================================
+# Shop buttons the bot buys from (Game.init_shop labels), cheapest first each time
+SHOP_PICKS = ("Damage +20%", "Fire Rate +0.5", "Pierce +1", "Regen +0.5", "BUY DRONE")
+
+
+def bot_shop(game):
+    """Heal up when hurt, then keep buying the cheapest upgrade it can afford."""
+    p = game.player
+    buttons = {b.text: b for b in game.buttons}
+    heal = buttons["Heal (30HP)"]
+    while p.health < p.stats["hp_max"] * 0.6 and heal.click(heal.rect.centerx, heal.rect.centery, p):
+        pass
+    while True:
+        affordable = [b for b in (buttons[name] for name in SHOP_PICKS) if b.cost_fn()[0] <= p.money]
+        if not affordable:
+            break
+        b = min(affordable, key=lambda b: b.cost_fn()[0])
+        b.click(b.rect.centerx, b.rect.centery, p)
+
+
+# ==========================================
+# PER-RUN STATS
+# ==========================================
+class RunStats:
+    """benchmark.run() observer: money at each wave's end, enemy lifetimes and tick times."""
+
+    def __init__(self):
+        self.money = []  # Money when each wave was cleared (before shopping)
+        self.alive = {}  # Enemy -> tick it was first seen (holding it keeps its uid unique)
+        self.kills = collections.defaultdict(list)  # Enemy type -> seconds from spawn to death
+        self.tick_bins = collections.Counter()  # Tick time histogram (TICK_BIN_MS bins)
+        self.was_active = True
+
+    def __call__(self, game, tick, seconds):
+        self.tick_bins[int(seconds * 1000.0 / TICK_BIN_MS)] += 1
+
+        for e in game.enemies:
+            if e not in self.alive:
+                self.alive[e] = tick
+        if len(self.alive) > len(game.enemies):
+            current = set(game.enemies)
+            for e in [e for e in self.alive if e not in current]:
+                self.kills[type(e).__name__].append((tick - self.alive.pop(e)) / SIM_RATE)
+
+        if self.was_active and not game.wave_active:
+            self.money.append(game.player.money)
+        self.was_active = game.wave_active
+
+
+def play(job):
+    """One seeded run in a worker process; returns plain data only (it's pickled back)."""
+    seed, waves, render = job
+    stats = RunStats()
+    result = benchmark.run(waves, seed, render, god_mode=False, shop=bot_shop, observer=stats)
+    cleared = result["waves"] if not result["game_over"] and result["completed"] else result["waves"] - 1
+    return {
+        "seed": seed,
+        "waves_survived": cleared,
+        "ticks": result["ticks"],
+        "seconds": result["seconds"],
+        "money": stats.money,
+        "kills": dict(stats.kills),
+        "tick_bins": dict(stats.tick_bins),
+    }
+
+
+# ==========================================
+# AGGREGATE
+# ==========================================
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list."""
+    if not values: return 0.0
+    return values[min(len(values) - 1, int(len(values) * pct / 100.0))]
+
+
+def bins_percentile(bins, pct):
+    """Percentile (ms, upper bin edge) of a tick time histogram."""
+    total = sum(bins.values())
+    seen = 0
+    for b in sorted(bins):
+        seen += bins[b]
+        if seen >= total * pct / 100.0:
+            return (b + 1) * TICK_BIN_MS
+    return 0.0
+
+
+def aggregate(results):
+    survived = collections.Counter(r["waves_survived"] for r in results)
+
+    money_by_wave = collections.defaultdict(list)
+    for r in results:
+        for wave, money in enumerate(r["money"], 1):
+            money_by_wave[wave].append(money)
+
+    kills = collections.defaultdict(list)
+    for r in results:
+        for kind, times in r["kills"].items():
+            kills[kind].extend(times)
+
+    tick_bins = collections.Counter()
+    for r in results:
+        tick_bins.update(r["tick_bins"])
+
+    return {
+        "runs": len(results),
+        "survived": dict(sorted(survived.items())),
+        "mean_survived": sum(r["waves_survived"] for r in results) / max(1, len(results)),
+        "money": {w: sum(m) / len(m) for w, m in sorted(money_by_wave.items())},
+        "kills": {k: sorted(v) for k, v in sorted(kills.items())},
+        "ticks": sum(tick_bins.values()),
+        "tick_ms": {pct: bins_percentile(tick_bins, pct) for pct in (50, 90, 99, 99.9, 100)},
+    }
+
+
+def print_summary(summary, elapsed):
+    print(f"{summary['runs']} runs, {summary['ticks']} ticks in {elapsed:.1f} s")
+    print(f"waves survived: mean {summary['mean_survived']:.2f}   "
+          + "  ".join(f"{w}: {n}" for w, n in summary["survived"].items()))
+    print(f"  {'wave':<6} {'avg money':>10}")
+    for wave, money in summary["money"].items():
+        print(f"  {wave:<6} {money:>10.0f}")
+    print(f"  {'enemy':<12} {'kills':>7} {'ttk p50':>8} {'p90':>7}")
+    for kind, times in summary["kills"].items():
+        print(f"  {kind:<12} {len(times):>7} {percentile(times, 50):>7.2f}s {percentile(times, 90):>6.2f}s")
+    print("  tick ms: " + "  ".join(f"p{pct:g} {ms:.1f}" for pct, ms in summary["tick_ms"].items()))
+
+
+def write_csv(path, results):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["seed", "waves_survived", "ticks", "seconds", "money_per_wave"])
+        for r in results:
+            writer.writerow([r["seed"], r["waves_survived"], r["ticks"], f"{r['seconds']:.3f}",
+                             " ".join(str(int(m)) for m in r["money"])])
+
+
+def init_worker():
+    # SDL otherwise catches SIGTERM (as a quit event), so Pool.terminate() couldn't stop the workers
+    os.environ["SDL_NO_SIGNAL_HANDLERS"] = "1"
+
+
+def run_batch(runs, waves=10, seed=1, jobs=None, render=False):
+    """Results of `runs` games on seeds seed..seed+runs-1, in seed order."""
+    work = [(seed + i, waves, render) for i in range(runs)]
+    with multiprocessing.Pool(jobs or multiprocessing.cpu_count(), initializer=init_worker) as pool:
+        return pool.map(play, work, chunksize=1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel headless Square Up runs")
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--waves", type=int, default=10, help="stop a run after this many waves")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the first run")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--render", action="store_true", help="also draw every tick (slower)")
+    parser.add_argument("--csv", help="write one row per run here")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run_batch(args.runs, args.waves, args.seed, args.jobs, args.render)
+    print_summary(aggregate(results), time.perf_counter() - start)
+    if args.csv:
+        write_csv(args.csv, results)
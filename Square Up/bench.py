@@ -0,0 +1,366 @@
+# bench.py
+"""
+Micro-benchmarks for Square Up's hot paths. No window needed:
+    python bench.py
+"""
+
+import math
+import random
+import time
+
+from config import *
+from utils import distance, check_grid_collision, has_line_of_sight, SightCache
+from spatial import SpatialHash
+from bullets import BulletArray
+from level import LevelGrid
+from pathfinding import FlowField, NextHopTable
+from visuals import ParticlePool
+
+
+class Dot:
+    """Stand-in for an enemy/bullet: just a position."""
+
+    def __init__(self, wx, wy):
+        self.wx = wx
+        self.wy = wy
+
+
+def timed(fn, repeats=20):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000.0  # ms per call
+
+
+# ==========================================
+# BULLET VS ENEMY: BRUTE FORCE VS SPATIAL HASH
+# ==========================================
+def bench_spatial(counts=(10, 50, 100, 200, 400, 800)):
+    rng = random.Random(1)
+    print("Bullets vs enemies (bullets = 2x enemies), ms per tick")
+    print(f"{'enemies':>8} {'brute':>10} {'hash':>10} {'speedup':>8}")
+    for n in counts:
+        enemies = [Dot(rng.uniform(1, MAP_W - 1), rng.uniform(1, MAP_H - 1)) for _ in range(n)]
+        bullets = [Dot(rng.uniform(1, MAP_W - 1), rng.uniform(1, MAP_H - 1)) for _ in range(n * 2)]
+        index = SpatialHash()
+
+        def brute():
+            hits = 0
+            for b in bullets:
+                for e in enemies:
+                    if distance(e.wx, e.wy, b.wx, b.wy) < 0.8:
+                        hits += 1
+            return hits
+
+        def hashed():
+            index.rebuild(enemies)
+            hits = 0
+            for b in bullets:
+                for e in index.query(b.wx, b.wy, 0.8):
+                    if distance(e.wx, e.wy, b.wx, b.wy) < 0.8:
+                        hits += 1
+            return hits
+
+        assert brute() == hashed()
+        t_brute = timed(brute, 5)
+        t_hash = timed(hashed, 5)
+        print(f"{n:>8} {t_brute:>10.3f} {t_hash:>10.3f} {t_brute / t_hash:>7.1f}x")
+
+    # Single point queries: contact damage (0.8), grenade blast (4.0), drone targeting (10.0)
+    print()
+    print("Single queries vs enemy count, us per query (index already built)")
+    print(f"{'enemies':>8} {'contact':>16} {'grenade':>16} {'drone':>16}")
+    for n in counts:
+        enemies = [Dot(rng.uniform(1, MAP_W - 1), rng.uniform(1, MAP_H - 1)) for _ in range(n)]
+        index = SpatialHash()
+        index.rebuild(enemies)
+        px, py = MAP_W / 2, MAP_H / 2
+        row = []
+        for radius in (0.8, 4.0):
+            t_brute = timed(lambda: [e for e in enemies if distance(px, py, e.wx, e.wy) < radius], 50) * 1000
+            t_hash = timed(lambda: index.query_radius(px, py, radius), 50) * 1000
+            row.append(f"{t_brute:7.1f}/{t_hash:<7.1f}")
+
+        def brute_nearest():
+            closest, min_d = None, 10.0
+            for e in enemies:
+                d = distance(px, py, e.wx, e.wy)
+                if d < min_d:
+                    closest, min_d = e, d
+            return closest
+
+        assert brute_nearest() is index.nearest(px, py, 10.0)
+        t_brute = timed(brute_nearest, 50) * 1000
+        t_hash = timed(lambda: index.nearest(px, py, 10.0), 50) * 1000
+        row.append(f"{t_brute:7.1f}/{t_hash:<7.1f}")
+        print(f"{n:>8} " + " ".join(f"{r:>16}" for r in row))
+    print("(brute / hash)")
+
+
+def bench_broadphase(counts=(50, 200, 800), ticks=60):
+    """Incremental sync() must answer like a rebuild as things move, appear and vanish; then per-tick cost."""
+    rng = random.Random(3)
+    print()
+    print("Keeping the index current (things move 1/60 s at enemy speed), ms per tick")
+    print(f"{'items':>8} {'rebuild':>10} {'sync':>10}")
+    for n in counts:
+        items = [Dot(rng.uniform(1, MAP_W - 1), rng.uniform(1, MAP_H - 1)) for _ in range(n)]
+        synced, rebuilt = SpatialHash(), SpatialHash()
+        for tick in range(ticks):
+            for d in items:
+                d.wx = min(MAP_W - 0.01, max(0.0, d.wx + rng.uniform(-0.1, 0.1)))
+                d.wy = min(MAP_H - 0.01, max(0.0, d.wy + rng.uniform(-0.1, 0.1)))
+            if tick % 10 == 0:
+                del items[rng.randrange(len(items))]
+                items.append(Dot(rng.uniform(1, MAP_W - 1), rng.uniform(1, MAP_H - 1)))
+            synced.sync(items)
+            rebuilt.rebuild(items)
+            assert synced.count == len(items)
+            px, py = rng.uniform(0, MAP_W), rng.uniform(0, MAP_H)
+            for radius in (0.8, 2.5, 4.0):
+                assert set(synced.query_radius(px, py, radius)) == set(rebuilt.query_radius(px, py, radius))
+
+        def walk():
+            for d in items:
+                d.wx = min(MAP_W - 0.01, max(0.0, d.wx + rng.uniform(-0.05, 0.05)))
+
+        t_walk = timed(walk, 20)
+        t_rebuild = timed(lambda: (walk(), rebuilt.rebuild(items)), 20) - t_walk
+        t_sync = timed(lambda: (walk(), synced.sync(items)), 20) - t_walk
+        print(f"{n:>8} {t_rebuild:>10.3f} {t_sync:>10.3f}")
+
+
+# ==========================================
+# LINE OF SIGHT: OLD SAMPLER VS GRID TRAVERSAL
+# ==========================================
+def sampled_line_of_sight(x1, y1, x2, y2, grid, spacing=0.5):
+    """The old raycast: test a point every `spacing` world units. Kept as a reference."""
+    dist = math.hypot(x2 - x1, y2 - y1)
+    steps = int(dist / spacing)
+    if steps < 1:
+        return True
+    for i in range(1, steps + 1):
+        t = i / steps
+        if check_grid_collision(x1 + (x2 - x1) * t, y1 + (y2 - y1) * t, grid):
+            return False
+    return True
+
+
+def random_grid(rng, w=MAP_W, h=MAP_H, density=0.1):
+    return LevelGrid([[1 if rng.random() < density else 0 for _ in range(w)] for __ in range(h)])
+
+
+def check_line_of_sight(rays=20000):
+    """
+    Correctness: the traversal must agree with a very fine sampler (spacing
+    0.001), and must never see through a wall the old 0.5 sampler hits.
+    """
+    rng = random.Random(2)
+    grid = random_grid(rng)
+    missed_by_sampler = 0
+    for _ in range(rays):
+        x1, y1 = rng.uniform(0, MAP_W), rng.uniform(0, MAP_H)
+        x2, y2 = rng.uniform(0, MAP_W), rng.uniform(0, MAP_H)
+        exact = has_line_of_sight(x1, y1, x2, y2, grid)
+        if not sampled_line_of_sight(x1, y1, x2, y2, grid):
+            assert not exact, (x1, y1, x2, y2)
+        elif not exact:
+            missed_by_sampler += 1
+        # Tiny sample spacing still misses corners clipped by < 0.001, so compare on short rays only
+        if math.hypot(x2 - x1, y2 - y1) < 8:
+            assert exact == sampled_line_of_sight(x1, y1, x2, y2, grid, 0.001), (x1, y1, x2, y2)
+    print(f"Line of sight: {rays} random rays OK, "
+          f"{missed_by_sampler} walls the 0.5 sampler saw through")
+
+
+def bench_line_of_sight(rays=2000):
+    rng = random.Random(3)
+    grid = random_grid(rng)
+    segs = [(rng.uniform(1, MAP_W - 1), rng.uniform(1, MAP_H - 1),
+             rng.uniform(1, MAP_W - 1), rng.uniform(1, MAP_H - 1)) for _ in range(rays)]
+    t_old = timed(lambda: [sampled_line_of_sight(*seg, grid) for seg in segs], 5)
+    t_new = timed(lambda: [has_line_of_sight(*seg, grid) for seg in segs], 5)
+    print(f"Line of sight, us per ray: sampler {t_old / rays * 1000:.2f}, "
+          f"traversal {t_new / rays * 1000:.2f} ({t_old / t_new:.1f}x)")
+
+    # 100 enemies packed onto a handful of tiles around the player's tile
+    cache = SightCache()
+    enemies = [(rng.uniform(10, 14), rng.uniform(10, 14)) for _ in range(100)]
+    px, py = MAP_W / 2, MAP_H / 2
+
+    def tick():
+        cache.clear()
+        return [cache.check(ex, ey, px, py, grid) for ex, ey in enemies]
+
+    t_uncached = timed(lambda: [has_line_of_sight(ex, ey, px, py, grid) for ex, ey in enemies])
+    t_cached = timed(tick)
+    print(f"100 enemies per tick, ms: uncached {t_uncached:.3f}, tile cache {t_cached:.3f}")
+
+
+# ==========================================
+# WALL COLLISION: NESTED LISTS VS LEVEL GRID FIELDS
+# ==========================================
+def listed_area_collision(min_x, max_x, min_y, max_y, grid):
+    """The old Entity.check_area_collision over grid[y][x]. Kept as a reference."""
+    for y in range(int(math.floor(min_y)), int(math.ceil(max_y))):
+        for x in range(int(math.floor(min_x)), int(math.ceil(max_x))):
+            if x < 0 or x >= len(grid[0]) or y < 0 or y >= len(grid):
+                return True
+            if grid[y][x] == 1:
+                return True
+    return False
+
+
+def bench_wall_collision(boxes=5000):
+    """Correctness and speed of the entity box test: old nested lists vs LevelGrid fields."""
+    rng = random.Random(5)
+    grid = random_grid(rng)
+    points = [(rng.uniform(1.1, MAP_W - 1.1), rng.uniform(1.1, MAP_H - 1.1)) for _ in range(boxes)]
+    for margin in (0.25, 0.35, 0.75, 1.15):
+        for x, y in points:
+            exact = listed_area_collision(x - margin, x + margin, y - margin, y + margin, grid)
+            assert grid.area_blocked(x - margin, x + margin, y - margin, y + margin) == exact, (x, y, margin)
+            assert grid.box_blocked(x, y, margin) == exact, (x, y, margin)
+            if grid.clearance(x, y) > math.ceil(margin):
+                assert not exact, (x, y, margin)
+
+    margin = 0.35  # Player / enemy radius - 0.05
+    t_old = timed(lambda: [listed_area_collision(x - margin, x + margin, y - margin, y + margin, grid)
+                           for x, y in points], 5)
+    t_new = timed(lambda: [grid.box_blocked(x, y, margin) for x, y in points], 5)
+    print(f"Wall box test, us per box: nested lists {t_old / boxes * 1000:.2f}, "
+          f"level fields {t_new / boxes * 1000:.2f} ({t_old / t_new:.1f}x)")
+
+
+# ==========================================
+# BULLETS: ONE OBJECT EACH VS STRUCTURE OF ARRAYS
+# ==========================================
+class ObjectBullet:
+    """The old per-object bullet (move, age, then a wall check per bullet). Kept as a reference."""
+
+    def __init__(self, wx, wy, vx, vy, lifetime):
+        self.wx, self.wy, self.vx, self.vy, self.lifetime = wx, wy, vx, vy, lifetime
+
+    def update(self, dt):
+        self.wx += self.vx * dt
+        self.wy += self.vy * dt
+        self.lifetime -= dt
+
+
+def bench_bullets(counts=(100, 500, 2000), ticks=30):
+    dt = 1.0 / SIM_RATE
+    print("Bullet update + wall test, ms per tick")
+    print(f"{'bullets':>8} {'objects':>10} {'arrays':>10} {'speedup':>8}")
+    for n in counts:
+        rng = random.Random(4)
+        grid = random_grid(rng)
+        shots = []
+        for _ in range(n):
+            angle = rng.uniform(0, 6.28)
+            shots.append((rng.uniform(1, MAP_W - 1), rng.uniform(1, MAP_H - 1), math.cos(angle), math.sin(angle)))
+
+        def objects():
+            bullets = [ObjectBullet(x, y, dx * 12, dy * 12, 3.0) for x, y, dx, dy in shots]
+            start = time.perf_counter()
+            for _ in range(ticks):
+                for b in bullets:
+                    b.update(dt)
+                    if check_grid_collision(b.wx, b.wy, grid):
+                        b.lifetime = 0
+                bullets = [b for b in bullets if b.lifetime > 0]
+            return time.perf_counter() - start, len(bullets)
+
+        def arrays():
+            bullets = BulletArray(n)
+            for x, y, dx, dy in shots:
+                bullets.spawn(x, y, dx, dy, 12, 1, 0, (0, 0, 0), 0)
+            start = time.perf_counter()
+            for _ in range(ticks):
+                bullets.update(dt, grid)
+            return time.perf_counter() - start, bullets.count
+
+        t_obj, left_obj = objects()
+        t_arr, left_arr = arrays()
+        assert left_obj == left_arr, (left_obj, left_arr)
+        t_obj, t_arr = t_obj / ticks * 1000, t_arr / ticks * 1000
+        print(f"{n:>8} {t_obj:>10.3f} {t_arr:>10.3f} {t_obj / t_arr:>7.1f}x")
+
+
+# ==========================================
+# PARTICLES: EVICTING THE OLDEST AT CAPACITY
+# ==========================================
+def bench_particles(spawns=20000):
+    """A full pool must overwrite exactly its oldest particle; then spawn cost below and at capacity."""
+    rng = random.Random(6)
+    pool = ParticlePool(MAX_PARTICLES)
+    for n in range(spawns):
+        if pool.count == pool.capacity:
+            oldest = min(range(pool.count), key=pool.born.__getitem__)
+            serial = pool.born[oldest]
+            pool.spawn(0, 0, (0, 0, 0), 1, rng.uniform(0.1, 2.0), 3)
+            assert pool.born[oldest] == pool.serial - 1 and serial not in pool.slot_of, n
+        else:
+            pool.spawn(0, 0, (0, 0, 0), 1, rng.uniform(0.1, 2.0), 3)
+        if n % 7 == 0:
+            pool.update(1.0 / SIM_RATE)  # Some die first, shuffling slots by swap-remove
+
+    def spawn_batch(pool):
+        for _ in range(1000):
+            pool.spawn(0, 0, (0, 0, 0), 1, 1.0, 3)
+
+    free = ParticlePool(1000 * 20)  # Room for every timed spawn
+    t_free = timed(lambda: spawn_batch(free), 20)
+    full = ParticlePool(MAX_PARTICLES)
+    spawn_batch(full)
+    spawn_batch(full)
+    t_full = timed(lambda: spawn_batch(full), 20)
+    print(f"Particle spawn, us: free slot {t_free:.3f}, full pool (evict oldest) {t_full:.3f}")
+
+
+# ==========================================
+# PATHFINDING: FLOW FIELD VS NEXT-HOP TABLE
+# ==========================================
+def bench_next_hop(targets=40):
+    """The table must give the flow field's tiles exactly; then build cost, memory and query speed."""
+    rng = random.Random(9)
+    grid = random_grid(rng)
+    table = NextHopTable(background=False)
+    flow = FlowField()
+    open_tiles = [(x, y) for y in range(MAP_H) for x in range(MAP_W) if not grid[y][x]]
+    for target in rng.sample(open_tiles, targets):
+        table.update(target, grid)
+        flow.update(target, grid)
+        for x, y in open_tiles:
+            assert table.next_tile(x, y) == flow.next_tile(x, y), (target, x, y)
+            d = flow.dist[grid.index(x, y)]
+            assert len(table.path((x, y), target)) == max(d, 0), (target, x, y)
+    print(table.report())
+
+    # Player walks onto a new tile every tick: the flow field re-runs its BFS, the table doesn't
+    walk = rng.sample(open_tiles, 60)
+    enemies = rng.sample(open_tiles, 100)
+
+    def tick(field):
+        for target in walk:
+            field.update(target, grid)
+            for x, y in enemies:
+                field.next_tile(x, y)
+
+    t_flow = timed(lambda: tick(flow), 3) / len(walk)
+    t_table = timed(lambda: tick(table), 3) / len(walk)
+    print(f"New player tile + 100 enemy lookups, ms: flow field {t_flow:.3f}, table {t_table:.3f} "
+          f"({t_flow / t_table:.1f}x)")
+
+
+if __name__ == "__main__":
+    bench_spatial()
+    bench_broadphase()
+    print()
+    check_line_of_sight()
+    bench_line_of_sight()
+    bench_wall_collision()
+    print()
+    bench_bullets()
+    bench_particles()
+    print()
+    bench_next_hop()
@@ -0,0 +1,131 @@
+# benchmark.py
+"""
+Headless, deterministic benchmark of the whole game loop. A scripted bot
+plays N waves on a fixed seed with no window, then the run is summarised:
+sim ticks per second, where the time went, and peak entity counts.
+    python benchmark.py                  # 3 waves, seed 1
+    python benchmark.py --waves 5 --seed 7 --no-render
+Same seed + same code = same game, so runs before/after a change compare.
+"""
+
+import argparse
+import math
+import time
+
+from config import *
+
+# Stages timed by Game.profiler, in loop order
+STAGES = ("player", "spawning", "projectiles", "ai", "collisions", "vm", "render")
+
+
+# ==========================================
+# SCRIPTED PLAYER
+# ==========================================
+def bot_input(game, tick):
+    """
+    Circle-strafe the nearest enemy and keep shooting at it; walk back to
+    the middle of the map when there is nothing to shoot.
+    """
+    p = game.player
+    target = game.broadphase.nearest("enemy", p.wx, p.wy, MAP_W + MAP_H)
+    if target is None:
+        dx, dy = MAP_W / 2 - p.wx, MAP_H / 2 - p.wy
+        move = (dx, dy) if math.hypot(dx, dy) > 1.0 else (0, 0)
+        return {"move": move, "dash": False, "fire": False, "aim": (p.wx + 1, p.wy)}
+
+    dx, dy = target.wx - p.wx, target.wy - p.wy
+    side = 1 if (tick // (SIM_RATE * 3)) % 2 == 0 else -1  # Swap direction every 3 s
+    move = (-dy * side, dx * side)
+    if math.hypot(dx, dy) < 3.0:
+        move = (move[0] - dx, move[1] - dy)  # Too close: back off while strafing
+    return {"move": move, "dash": tick % (SIM_RATE * 2) == 0, "fire": True, "aim": (target.wx, target.wy)}
+
+
+# ==========================================
+# RUN
+# ==========================================
+def run(waves=3, seed=1, render=True, max_ticks=SIM_RATE * 600, god_mode=True, shop=None, observer=None,
+        record=None):
+    """
+    Plays up to `waves` waves. Between waves shop(game) may spend the
+    player's money; observer(game, tick, seconds) is called after every
+    tick with that tick's wall time. With `record`, the game is saved
+    there as a replay (shop purchases aren't recorded).
+    """
+    from main import Game
+    from replay import state_digest
+
+    game = Game(headless=True, seed=seed, record=bool(record), god_mode=god_mode, deterministic=True)
+    game.intro_active = False
+    sim_dt = 1.0 / SIM_RATE
+
+    peaks = {"enemies": 0, "bullets": 0, "orbs": 0, "particles": 0}
+    tick = 0
+    start = time.perf_counter()
+    while tick < max_ticks and not game.game_over:
+        inp = bot_input(game, tick)
+        if not game.wave_active:
+            if game.level >= waves:
+                break
+            if shop:
+                shop(game)
+            inp["actions"] = [("next_level",)]
+
+        tick_start = time.perf_counter()
+        game.snapshot_positions()
+        game.simulate(sim_dt, inp)
+        if render:
+            game.render(sim_dt, 1.0)
+        else:
+            game.update_visuals(sim_dt)
+        tick += 1
+        if observer:
+            observer(game, tick, time.perf_counter() - tick_start)
+
+        peaks["enemies"] = max(peaks["enemies"], len(game.enemies))
+        peaks["bullets"] = max(peaks["bullets"], len(game.bullets))
+        peaks["orbs"] = max(peaks["orbs"], len(game.orbs))
+        peaks["particles"] = max(peaks["particles"], len(game.vm.particles))
+    elapsed = time.perf_counter() - start
+    if record:
+        game.input_log.save(record, state_digest(game))
+
+    return {
+        "seed": seed,
+        "ticks": tick,
+        "waves": game.level,
+        "completed": not game.wave_active and game.level >= waves,
+        "game_over": game.game_over,
+        "money": game.player.money,
+        "seconds": elapsed,
+        "ticks_per_sec": tick / elapsed if elapsed else 0.0,
+        "stages": {name: game.profiler.totals.get(name, 0.0) for name in STAGES},
+        "peaks": peaks,
+        "pathfinding": game.flow_field.report() if hasattr(game.flow_field, "report") else "pathfinding: flow field",
+    }
+
+
+def print_report(result):
+    print(f"seed {result['seed']}: {result['ticks']} ticks, wave {result['waves']}"
+          f"{'' if result['completed'] else ' (incomplete)'}, {result['seconds']:.2f} s")
+    print(f"  {result['ticks_per_sec']:.1f} ticks/sec "
+          f"({result['ticks_per_sec'] / SIM_RATE:.2f}x real time at {SIM_RATE} Hz)")
+    total = sum(result["stages"].values()) or 1.0
+    ticks = max(1, result["ticks"])
+    print(f"  {'stage':<12} {'ms/tick':>8} {'share':>7}")
+    for name, seconds in result["stages"].items():
+        print(f"  {name:<12} {seconds * 1000.0 / ticks:>8.3f} {seconds / total:>6.1%}")
+    print("  peaks: " + ", ".join(f"{k} {v}" for k, v in result["peaks"].items()))
+    if "pathfinding" in result:
+        print(f"  {result['pathfinding']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless Square Up benchmark")
+    parser.add_argument("--waves", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-render", action="store_true", help="skip drawing (simulation only)")
+    parser.add_argument("--max-ticks", type=int, default=SIM_RATE * 600)
+    parser.add_argument("--record", metavar="PATH", help="also save the run as a replay (see replay.py)")
+    args = parser.parse_args()
+    print_report(run(args.waves, args.seed, not args.no_render, args.max_ticks, record=args.record))
@@ -0,0 +1,146 @@
+# bullets.py
+import math
+import pygame
+
+# ==========================================
+# BULLETS (STRUCTURE OF ARRAYS)
+# ==========================================
+
+class BulletArray:
+    """
+    One side's bullets stored as a structure of arrays (like
+    visuals.ParticlePool): one list per field, `count` live bullets packed at
+    the front, dead ones swap-removed. update() moves every bullet, ages it
+    and tests it against the map in a single pass over the arrays.
+    The arrays grow when full; bullets are never dropped.
+    """
+
+    # Fields copied when a bullet moves slot ("hits" sets are swapped instead)
+    FIELDS = ("x", "y", "prev_x", "prev_y", "vx", "vy", "life", "damage",
+              "pierce", "owner", "color", "radius")
+
+    def __init__(self, capacity=256):
+        self.count = 0
+        self.capacity = 0
+        for name in self.FIELDS:
+            setattr(self, name, [])
+        self.hits = []  # Per bullet: uids already pierced, so each enemy is hit once
+        self.grow(capacity)
+
+    def __len__(self):
+        return self.count
+
+    def grow(self, extra):
+        for name in self.FIELDS:
+            getattr(self, name).extend([0] * extra)
+        self.hits.extend(set() for _ in range(extra))
+        self.capacity += extra
+
+    def spawn(self, wx, wy, dx, dy, speed, damage, pierce, color, owner_id, lifetime=3.0, radius=5):
+        """Fires from (wx, wy) along (dx, dy), which doesn't need to be normalised."""
+        if self.count == self.capacity:
+            self.grow(self.capacity)
+        i = self.count
+        self.count += 1
+        l = math.hypot(dx, dy)
+        if l == 0: l = 1
+        self.x[i] = self.prev_x[i] = wx
+        self.y[i] = self.prev_y[i] = wy
+        self.vx[i] = dx / l * speed
+        self.vy[i] = dy / l * speed
+        self.life[i] = lifetime
+        self.damage[i] = damage
+        self.pierce[i] = pierce
+        self.owner[i] = owner_id
+        self.color[i] = color
+        self.radius[i] = radius
+        self.hits[i].clear()
+
+    def remove(self, i):
+        last = self.count - 1
+        if i != last:
+            for name in self.FIELDS:
+                field = getattr(self, name)
+                field[i] = field[last]
+            self.hits[i], self.hits[last] = self.hits[last], self.hits[i]
+        self.count = last
+
+    def update(self, dt, grid):
+        """
+        Moves and ages every bullet, dropping expired ones and those now inside
+        a wall (or off the map) of the level.LevelGrid. Returns the (wx, wy)
+        of each wall impact.
+        """
+        xs, ys, vxs, vys, life = self.x, self.y, self.vx, self.vy, self.life
+        w, h, stride, solid = grid.w, grid.h, grid.stride, grid.solid
+        impacts = []
+        i = 0
+        while i < self.count:
+            life[i] -= dt
+            if life[i] <= 0:
+                self.remove(i)
+                continue  # Slot i now holds the bullet moved from the end
+            x = xs[i] = xs[i] + vxs[i] * dt
+            y = ys[i] = ys[i] + vys[i] * dt
+            ix, iy = int(x), int(y)
+            # The solid border catches anything just off the map
+            if ix < -1 or ix > w or iy < -1 or iy > h or solid[(iy + 1) * stride + ix + 1]:
+                impacts.append((x, y))
+                self.remove(i)
+                continue
+            i += 1
+        return impacts
+
+    def snapshot(self):
+        n = self.count
+        self.prev_x[:n] = self.x[:n]
+        self.prev_y[:n] = self.y[:n]
+
+    def positions(self, alpha=1.0):
+        """World positions, `alpha` of the way from the previous sim step to now."""
+        xs, ys, pxs, pys = self.x, self.y, self.prev_x, self.prev_y
+        return [(pxs[i] + (xs[i] - pxs[i]) * alpha, pys[i] + (ys[i] - pys[i]) * alpha)
+                for i in range(self.count)]
+
+    def draw(self, surf, cam, alpha=1.0, culler=None):
+        points = self.positions(alpha)
+        slots = range(self.count)
+        if culler:
+            slots = [i for i, (wx, wy) in enumerate(points) if culler.contains(wx, wy, 0.5)]
+            culler.count("bullets", len(slots), self.count - len(slots))
+            points = [points[i] for i in slots]
+        zoom = cam.zoom
+        color, radius = self.color, self.radius
+        # Project every visible bullet in one batch
+        for i, (sx, sy) in zip(slots, cam.project_points(points)):
+            r = radius[i] * zoom
+            pygame.draw.circle(surf, (255, 200, 50), (sx, sy), r + 2, 1)
+            pygame.draw.circle(surf, color[i], (sx, sy), r)
+
+
+class BulletManager:
+    """
+    Player bullets and enemy bullets kept in separate arrays, so the
+    collision stage only tests each side against what it can hit.
+    """
+
+    def __init__(self):
+        self.player = BulletArray()
+        self.enemy = BulletArray()
+        self.sides = (self.player, self.enemy)
+
+    def __len__(self):
+        return self.player.count + self.enemy.count
+
+    def update(self, dt, grid):
+        """Moves both sides; returns every wall impact point."""
+        return self.player.update(dt, grid) + self.enemy.update(dt, grid)
+
+    def snapshot(self):
+        for side in self.sides: side.snapshot()
+
+    def positions(self, alpha=1.0):
+        return self.player.positions(alpha) + self.enemy.positions(alpha)
+
+    def draw(self, surf, cam, alpha=1.0, culler=None):
+        for side in self.sides: side.draw(surf, cam, alpha, culler)
@@ -1,5 +1,5 @@
 # camera.py
-import random
+import rng
 import math
 from config import *
 
@@ -28,6 +28,8 @@ class Camera:
         self.shake_offset_x = 0
         self.shake_offset_y = 0
 
+        self.update_projection()
+
     def rotate_view(self):
         # Update the logical index (for controls)
         self.rotation_index = (self.rotation_index + 1) % 4
@@ -48,6 +50,13 @@ class Camera:
         self.target_wx = wx
         self.target_wy = wy
 
+    def snap_to(self, wx, wy):
+        """Jump straight to a focus point (no smoothing)."""
+        self.set_target(wx, wy)
+        self.focus_wx = wx
+        self.focus_wy = wy
+        self.update_projection()
+
     def update(self, dt):
         # 1. Smoothly interpolate Focus Point and Zoom
         speed = 5.0
@@ -60,69 +69,88 @@ class Camera:
         diff = self.target_angle - self.angle
         self.angle += diff * 10.0 * dt
 
+        # Snap once close enough, so a settled view has exact (cacheable) values
+        if abs(self.target_zoom - self.zoom) < 0.001: self.zoom = self.target_zoom
+        if abs(self.target_angle - self.angle) < 0.001: self.angle = self.target_angle
+
         # 3. Handle Shake
         if self.shake_timer > 0:
             self.shake_timer -= dt
-            self.shake_offset_x = random.uniform(-self.shake_mag, self.shake_mag)
-            self.shake_offset_y = random.uniform(-self.shake_mag, self.shake_mag)
+            self.shake_offset_x = rng.fx.uniform(-self.shake_mag, self.shake_mag)
+            self.shake_offset_y = rng.fx.uniform(-self.shake_mag, self.shake_mag)
             self.shake_mag = max(0, self.shake_mag - 60 * dt)
         else:
             self.shake_offset_x = 0
             self.shake_offset_y = 0
 
-    def world_to_screen(self, wx, wy):
-        tile_w = TILE_W_BASE * self.zoom
-        tile_h = TILE_H_BASE * self.zoom
-
-        # A. Center coordinates relative to camera focus
-        rx = wx - self.focus_wx
-        ry = wy - self.focus_wy
+        self.update_projection()
 
-        # B. Apply Smooth Rotation (Trigonometry)
+    def update_projection(self):
+        """
+        Builds the world -> screen matrix for this frame, so projecting a point
+        is just 2 multiply-adds per axis (no cos/sin per call):
+            sx = m00 * wx + m01 * wy + tx
+            sy = m10 * wx + m11 * wy + ty
+        """
         c = math.cos(self.angle)
         s = math.sin(self.angle)
+        half_w = TILE_W_BASE * self.zoom / 2.0
+        half_h = TILE_H_BASE * self.zoom / 2.0
+
+        # Rotation followed by the isometric projection, folded into one 2x2 matrix
+        self.m00 = (c - s) * half_w
+        self.m01 = -(s + c) * half_w
+        self.m10 = (c + s) * half_h
+        self.m11 = (c - s) * half_h
+
+        # Translation: focus point to screen centre, plus shake
+        self.tx = (self.w / 2.0) + self.shake_offset_x - (self.m00 * self.focus_wx + self.m01 * self.focus_wy)
+        self.ty = (self.h / 2.0) + self.shake_offset_y - (self.m10 * self.focus_wx + self.m11 * self.focus_wy)
+
+        # Depth axis: screen-y order without the projection. At rotation 0 this is
+        # wx + wy (Entity.get_sort_y); each 90 degree turn swaps/negates the terms
+        self.depth_x = c + s
+        self.depth_y = c - s
+
+        # Inverse of the 2x2 part (det is always 2 * half_w * half_h, never 0)
+        det = self.m00 * self.m11 - self.m01 * self.m10
+        self.i00 = self.m11 / det
+        self.i01 = -self.m01 / det
+        self.i10 = -self.m10 / det
+        self.i11 = self.m00 / det
+
+    def visible_bounds(self, margin=0):
+        """World-space rectangle (min_x, min_y, max_x, max_y) that covers the screen plus a pixel margin."""
+        corners = self.unproject_points([(-margin, -margin), (self.w + margin, -margin),
+                                         (self.w + margin, self.h + margin), (-margin, self.h + margin)])
+        xs = [p[0] for p in corners]
+        ys = [p[1] for p in corners]
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def depth(self, wx, wy):
+        """Back-to-front sort key (bigger = nearer the viewer)."""
+        return wx * self.depth_x + wy * self.depth_y
+
+    def is_settled(self):
+        """True when zoom and rotation have finished animating (only panning/shake left)."""
+        return self.zoom == self.target_zoom and self.angle == self.target_angle
 
-        # Standard 2D rotation formula
-        rot_x = rx * c - ry * s
-        rot_y = rx * s + ry * c
-
-        # C. Isometric Projection (on the rotated coordinates)
-        iso_x = (rot_x - rot_y) * (tile_w / 2.0)
-        iso_y = (rot_x + rot_y) * (tile_h / 2.0)
-
-        # D. Screen Offset & Shake
-        final_sx = iso_x + (self.w / 2.0) + self.shake_offset_x
-        final_sy = iso_y + (self.h / 2.0) + self.shake_offset_y
-
-        return final_sx, final_sy
+    def world_to_screen(self, wx, wy):
+        return (self.m00 * wx + self.m01 * wy + self.tx,
+                self.m10 * wx + self.m11 * wy + self.ty)
 
     def screen_to_world(self, sx, sy):
-        tile_w = TILE_W_BASE * self.zoom
-        tile_h = TILE_H_BASE * self.zoom
-
-        # A. Remove Screen Offset & Shake
-        adj_x = sx - (self.w / 2.0) - self.shake_offset_x
-        adj_y = sy - (self.h / 2.0) - self.shake_offset_y
-
-        # B. Inverse Isometric Projection
-        # Solve for rot_x, rot_y
-        val_x = adj_x / (tile_w / 2.0)
-        val_y = adj_y / (tile_h / 2.0)
-
-        rot_x = (val_x + val_y) / 2.0
-        rot_y = (val_y - val_x) / 2.0
-
-        # C. Inverse Rotation
-        # To invert the rotation, we rotate by -angle (or just use transposed matrix)
-        c = math.cos(self.angle)
-        s = math.sin(self.angle)
-
-        # Inverse rotation formula
-        rx = rot_x * c + rot_y * s
-        ry = -rot_x * s + rot_y * c
-
-        # D. Add Focus Point back
-        wx = rx + self.focus_wx
-        wy = ry + self.focus_wy
-
-        return wx, wy
\ No newline at end of file
+        sx -= self.tx
+        sy -= self.ty
+        return (self.i00 * sx + self.i01 * sy,
+                self.i10 * sx + self.i11 * sy)
+
+    def project_points(self, points):
+        """Projects a whole list of (wx, wy) in one call. Returns a list of (sx, sy)."""
+        m00, m01, m10, m11, tx, ty = self.m00, self.m01, self.m10, self.m11, self.tx, self.ty
+        return [(m00 * wx + m01 * wy + tx, m10 * wx + m11 * wy + ty) for wx, wy in points]
+
+    def unproject_points(self, points):
+        """Inverse of project_points: list of (sx, sy) -> list of (wx, wy)."""
+        i00, i01, i10, i11, tx, ty = self.i00, self.i01, self.i10, self.i11, self.tx, self.ty
+        return [(i00 * (sx - tx) + i01 * (sy - ty), i10 * (sx - tx) + i11 * (sy - ty)) for sx, sy in points]
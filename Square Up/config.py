@@ -6,9 +6,21 @@
 SCREEN_W, SCREEN_H = 1280, 720
 FPS = 120
 
+# Simulation runs at a fixed rate, independent of FPS (rendering interpolates)
+SIM_RATE = 60
+MAX_SIM_STEPS = 5  # Per frame; past this the sim slows down instead of spiralling
+
+# Lighting Quality: the light buffer is SCREEN / LIGHT_QUALITY
+# 1 = full resolution, 2 = half, 4 = quarter (upscaled once per frame)
+LIGHT_QUALITY = 1
+LIGHT_QUALITY_LEVELS = (1, 2, 4)
+# Memory for pre-scaled light sprites (the player light alone is ~17 MB at max zoom)
+LIGHT_CACHE_BYTES = 32 * 1024 * 1024
+
 # World Settings
 TILE_W_BASE, TILE_H_BASE = 96, 48
 MAP_W, MAP_H = 40, 40
+FLOOR_CHUNK = 8  # Tiles per side of one baked floor chunk
 
 # Zoom Limits
 ZOOM_MIN = 0.5
@@ -19,6 +31,29 @@ PLAYER_BASE_SPEED = 5.0
 PLAYER_START_HP = 100
 PLAYER_START_GRENADES = 3
 
+# Effect Limits (oldest are evicted first)
+MAX_PARTICLES = 1500
+MAX_DECALS = 250  # Per type: casings, debris, ghosts, cracks, floating texts
+
+# Pathfinding: all-pairs next-hop table (pathfinding.NextHopTable) instead of the
+# flow field. Same paths; lookups never wait on a BFS, but each level's table
+# takes a second or two of background CPU to build
+PATH_NEXT_HOP = False
+NEXT_HOP_MAX_TILES = 2500  # Walkable tiles; the table takes tiles^2 * 2 bytes (12 MB at the limit)
+
+# Enemy AI Scheduling: decisions (line of sight, boss patterns) are spread
+# over ticks; movement still runs every tick
+AI_NEAR = 10.0            # Tiles: closer enemies decide every tick
+AI_FAR = 18.0             # Tiles: further ones skip line of sight and follow the flow field
+AI_MID_INTERVAL = 0.1     # Seconds between decisions in between
+AI_FAR_INTERVAL = 0.3
+AI_MAX_THINKS = 24        # Decisions per tick, the rest wait their turn (round robin)
+AI_BUDGET_MS = 2.0        # ...or until this much time went on them (None = no time limit)
+
+# Profiler Overlay (F3 toggles, F4 dumps a CSV trace)
+PROFILER_WINDOW = 120  # Frames in the rolling averages / p99
+PROFILER_TRACE = 3600  # Frames kept for the CSV dump
+
 # Physics Constants
 GRAVITY = 20.0
 FRICTION = 0.9
@@ -0,0 +1,42 @@
+# culling.py
+
+# ==========================================
+# VIEW CULLING
+# ==========================================
+
+class Culler:
+    """
+    Once per frame, works out which part of the world is on screen (the
+    camera's inverse projection of the screen corners) and filters draw
+    lists against it, so off-screen objects never reach pygame.draw.
+    `stats` holds {category: [drawn, culled]} for the last frame.
+    """
+
+    # Extra screen pixels around the view: sprites are drawn above their feet
+    MARGIN = 120
+
+    def __init__(self):
+        self.min_x = self.min_y = 0.0
+        self.max_x = self.max_y = 0.0
+        self.stats = {}
+
+    def begin(self, cam):
+        self.min_x, self.min_y, self.max_x, self.max_y = cam.visible_bounds(self.MARGIN * cam.zoom)
+        self.stats = {}
+
+    def contains(self, wx, wy, pad=0.0):
+        return (self.min_x - pad <= wx <= self.max_x + pad and
+                self.min_y - pad <= wy <= self.max_y + pad)
+
+    def count(self, category, drawn, culled):
+        entry = self.stats.setdefault(category, [0, 0])
+        entry[0] += drawn
+        entry[1] += culled
+
+    def visible(self, items, category, pad=0.0):
+        """The items (anything with .wx/.wy) that are on screen."""
+        min_x, min_y = self.min_x - pad, self.min_y - pad
+        max_x, max_y = self.max_x + pad, self.max_y + pad
+        shown = [o for o in items if min_x <= o.wx <= max_x and min_y <= o.wy <= max_y]
+        self.count(category, len(shown), len(items) - len(shown))
+        return shown
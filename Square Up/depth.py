@@ -0,0 +1,53 @@
+# depth.py
+
+# ==========================================
+# DEPTH ORDERING (PAINTER'S ALGORITHM)
+# ==========================================
+
+class DepthSorter:
+    """
+    Keeps the dynamic entities in back-to-front order across frames.
+    The key is the camera's depth axis (get_sort_y turned with the view),
+    so no projection is needed. Entities barely move between frames, so
+    last frame's order is almost sorted already and an insertion pass over
+    it is close to O(n). A full sort is only used after the view rotates.
+    """
+
+    def __init__(self):
+        self.order = []
+        self.keys = []
+        self.rotation_index = None
+
+    def update(self, entities, cam):
+        """Returns the entities sorted back to front (self.keys holds their depths)."""
+        # Keep survivors in last frame's order, append newcomers at the end
+        current = set(entities)
+        order = [e for e in self.order if e in current]
+        if len(order) != len(entities):
+            known = set(order)
+            order.extend(e for e in entities if e not in known)
+
+        dx, dy = cam.depth_x, cam.depth_y
+        if cam.rotation_index != self.rotation_index:
+            # The whole order flips when the view turns: start from a real sort
+            self.rotation_index = cam.rotation_index
+            order.sort(key=lambda e: e.wx * dx + e.wy * dy)
+        keys = [e.wx * dx + e.wy * dy for e in order]
+
+        # Insertion sort: cheap on nearly sorted input, and stable
+        for i in range(1, len(order)):
+            k = keys[i]
+            if keys[i - 1] <= k:
+                continue
+            e = order[i]
+            j = i - 1
+            while j >= 0 and keys[j] > k:
+                keys[j + 1] = keys[j]
+                order[j + 1] = order[j]
+                j -= 1
+            keys[j + 1] = k
+            order[j + 1] = e
+
+        self.order = order
+        self.keys = keys
+        return order
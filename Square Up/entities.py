@@ -1,38 +1,11 @@
 # entities.py
 import math
-import random
+import rng
 import pygame
 from config import *
-from utils import clamp, check_grid_collision, has_line_of_sight, get_path_bfs, distance
-
-
-# --- BULLET CLASS ---
-class Bullet:
-    def __init__(self, wx, wy, vx, vy, speed, damage, pierce_count, color, owner_id):
-        self.wx = wx
-        self.wy = wy
-        l = math.hypot(vx, vy)
-        if l == 0: l = 1
-        self.vx = (vx / l) * speed
-        self.vy = (vy / l) * speed
-        self.damage = damage
-        self.pierce = pierce_count
-        self.lifetime = 3.0
-        self.radius = 5
-        self.hit_list = []
-        self.color = color
-        self.owner_id = owner_id
-
-    def update(self, dt):
-        self.wx += self.vx * dt
-        self.wy += self.vy * dt
-        self.lifetime -= dt
-
-    def draw(self, surf, cam):
-        sx, sy = cam.world_to_screen(self.wx, self.wy)
-        r = self.radius * cam.zoom
-        pygame.draw.circle(surf, (255, 200, 50), (sx, sy), r + 2, 1)
-        pygame.draw.circle(surf, self.color, (sx, sy), r)
+from utils import clamp, has_line_of_sight, get_path_bfs, distance
+from visuals import sprite_cache
+from pool import ObjectPool
 
 
 # --- GRENADE CLASS ---
@@ -61,11 +34,11 @@ class Grenade:
         if self.exploded: return
         next_x = self.x + self.vx * dt
         next_y = self.y + self.vy * dt
-        if check_grid_collision(next_x, self.y, grid):
+        if grid.blocked(next_x, self.y):
             self.vx = -self.vx * 0.6
         else:
             self.x = next_x
-        if check_grid_collision(self.x, next_y, grid):
+        if grid.blocked(self.x, next_y):
             self.vy = -self.vy * 0.6
         else:
             self.y = next_y
@@ -95,6 +68,8 @@ class Entity:
     def __init__(self, wx, wy):
         self.wx = wx
         self.wy = wy
+        self.prev_wx = wx  # Position at the previous sim step, for render interpolation
+        self.prev_wy = wy
         self.z = 0
         self.radius = 0.4
         self.dead = False
@@ -125,31 +100,21 @@ class Entity:
         if abs(self.knockback_y) < 0.1: self.knockback_y = 0
 
     def check_area_collision(self, min_x, max_x, min_y, max_y, grid):
-        start_x = int(math.floor(min_x))
-        end_x = int(math.ceil(max_x))
-        start_y = int(math.floor(min_y))
-        end_y = int(math.ceil(max_y))
-
-        for y in range(start_y, end_y):
-            for x in range(start_x, end_x):
-                if x < 0 or x >= len(grid[0]) or y < 0 or y >= len(grid):
-                    return True
-                if grid[y][x] == 1:
-                    return True
-        return False
+        return grid.area_blocked(min_x, max_x, min_y, max_y)
 
     def check_wall_collision(self, dx, dy, grid):
         margin = self.radius - 0.05
+        # grid.box_blocked is a couple of lookups in the level's precomputed fields
         if dx != 0:
             original_x = self.wx
             self.wx += dx
-            if self.check_area_collision(self.wx - margin, self.wx + margin, self.wy - margin, self.wy + margin, grid):
+            if grid.box_blocked(self.wx, self.wy, margin):
                 self.wx = original_x
                 self.knockback_x = 0
         if dy != 0:
             original_y = self.wy
             self.wy += dy
-            if self.check_area_collision(self.wx - margin, self.wx + margin, self.wy - margin, self.wy + margin, grid):
+            if grid.box_blocked(self.wx, self.wy, margin):
                 self.wy = original_y
                 self.knockback_y = 0
         self.wx = clamp(self.wx, 1.1, MAP_W - 1.1)
@@ -166,12 +131,20 @@ class Entity:
 
 
 # --- ENERGY ORB ---
-class EnergyOrb(Entity):
+class EnergyOrb:
+    __slots__ = ("wx", "wy", "prev_wx", "prev_wy", "radius", "lifetime", "bob_offset", "color")
+
     def __init__(self, wx, wy):
-        super().__init__(wx, wy)
+        self.reset(wx, wy)
+
+    def reset(self, wx, wy):
+        self.wx = wx
+        self.wy = wy
+        self.prev_wx = wx  # Position at the previous sim step, for render interpolation
+        self.prev_wy = wy
         self.radius = 0.3
         self.lifetime = 15.0
-        self.bob_offset = random.uniform(0, 6.28)
+        self.bob_offset = rng.sim.uniform(0, 6.28)
         self.color = COL_ENERGY
 
     def update(self, dt):
@@ -183,63 +156,14 @@ class EnergyOrb(Entity):
         bob = math.sin(self.bob_offset) * 5
         for i in range(3):
             alpha = 100 - (i * 30)
-            r = (8 + i * 4) * cam.zoom
-            s = pygame.Surface((r * 2, r * 2), pygame.SRCALPHA)
-            pygame.draw.circle(s, (*self.color, alpha), (r, r), r)
+            s = sprite_cache.circle((8 + i * 4) * cam.zoom, self.color, alpha)
+            r = s.get_width() // 2
             surf.blit(s, (sx - r, sy - r - 10 - bob))
         pygame.draw.circle(surf, (255, 255, 255), (sx, sy - 10 - bob), 4 * cam.zoom)
 
 
-# --- WALL BLOCK ---
-class WallBlock(Entity):
-    def __init__(self, wx, wy, color_top, color_side):
-        super().__init__(wx, wy)
-        self.color_top = color_top
-        self.color_side = color_side
-        self.wx = wx + 0.5
-        self.wy = wy + 0.5
-
-    def draw_shadow(self, surf, cam):
-        pass
-
-    def draw(self, surf, cam):
-        x1, y1 = self.wx - 0.5, self.wy - 0.5
-        x2, y2 = self.wx + 0.5, self.wy - 0.5
-        x3, y3 = self.wx + 0.5, self.wy + 0.5
-        x4, y4 = self.wx - 0.5, self.wy + 0.5
-
-        s1 = cam.world_to_screen(x1, y1)
-        s2 = cam.world_to_screen(x2, y2)
-        s3 = cam.world_to_screen(x3, y3)
-        s4 = cam.world_to_screen(x4, y4)
-
-        wall_h = 30 * cam.zoom
-
-        t1 = (s1[0], s1[1] - wall_h)
-        t2 = (s2[0], s2[1] - wall_h)
-        t3 = (s3[0], s3[1] - wall_h)
-        t4 = (s4[0], s4[1] - wall_h)
-
-        corners = [s1, s2, s3, s4]
-        top_corners = [t1, t2, t3, t4]
-
-        lowest_i = 0
-        max_y = corners[0][1]
-        for i in range(1, 4):
-            if corners[i][1] > max_y:
-                max_y = corners[i][1]
-                lowest_i = i
-
-        prev_i = (lowest_i - 1) % 4
-        next_i = (lowest_i + 1) % 4
-
-        poly_side1 = [corners[lowest_i], corners[prev_i], top_corners[prev_i], top_corners[lowest_i]]
-        poly_side2 = [corners[lowest_i], corners[next_i], top_corners[next_i], top_corners[lowest_i]]
-
-        pygame.draw.polygon(surf, self.color_side, poly_side1)
-        pygame.draw.polygon(surf, self.color_side, poly_side2)
-        pygame.draw.polygon(surf, self.color_top, top_corners)
-        pygame.draw.polygon(surf, (0, 0, 0), top_corners, 1)
+# Shared across waves: collected orbs come back through compact()
+orb_pool = ObjectPool(EnergyOrb, 200)
 
 
 # --- BASE ENEMY ---
@@ -258,6 +182,11 @@ class Enemy(Entity):
         self.debris_type = "blood"
         self.path = []
         self.path_timer = 0.0
+        self.flow_field = None  # Shared pathfinding.FlowField (set by the game)
+        self.sight_cache = None  # Shared utils.SightCache (set by the game)
+        self.broadphase = None  # Shared spatial.Broadphase (set by the game)
+        self.can_see = None  # Last think() result (None = hasn't thought yet)
+        self.think_timer = 0.0  # Until the next think() (counted down by ai.AIScheduler)
 
     def take_damage(self, amt):
         self.health -= amt
@@ -266,6 +195,19 @@ class Enemy(Entity):
             self.dead = True
             self.vm.add_debris(self.wx, self.wy, self.debris_type, self.color)
 
+    def think(self, player, grid, far=False):
+        """
+        The costly decisions, re-run every few ticks rather than every tick
+        (see ai.AIScheduler): can we see the player? Far away we don't even
+        look and just follow the flow field.
+        """
+        if far and self.flow_field:
+            self.can_see = False
+        elif self.sight_cache:
+            self.can_see = self.sight_cache.check(self.wx, self.wy, player.wx, player.wy, grid)
+        else:
+            self.can_see = has_line_of_sight(self.wx, self.wy, player.wx, player.wy, grid)
+
     def update(self, dt, player, grid, bullets, cam):
         self.physics_update(dt, grid)
 
@@ -274,16 +216,28 @@ class Enemy(Entity):
 
         if abs(self.knockback_x) + abs(self.knockback_y) < 2.0:
             dist_to_player = distance(self.wx, self.wy, player.wx, player.wy)
+            if self.can_see is None:
+                self.think(player, grid)
 
-            # Simple Line of Sight Check
-            can_see = has_line_of_sight(self.wx, self.wy, player.wx, player.wy, grid)
-
-            if can_see:
+            if self.can_see:
                 self.path = []
                 dx = player.wx - self.wx
                 dy = player.wy - self.wy
                 if dist_to_player > 0.1:
                     self.move_towards(dx, dy, dist_to_player, dt, grid)
+            elif self.flow_field:
+                # Shared flow field: next tile towards the player is a single lookup
+                target_wx, target_wy = player.wx, player.wy
+                if dist_to_player > 1.0:
+                    step = self.flow_field.next_tile(int(self.wx), int(self.wy))
+                    if step:
+                        target_wx, target_wy = step[0] + 0.5, step[1] + 0.5
+
+                dx = target_wx - self.wx
+                dy = target_wy - self.wy
+                dist = math.hypot(dx, dy)
+                if dist > 0.1:
+                    self.move_towards(dx, dy, dist, dt, grid)
             else:
                 self.path_timer -= dt
                 if self.path_timer <= 0:
@@ -362,7 +316,7 @@ class BlockEnemy(Enemy):
         self.debris_type = "robot_parts"
 
         # Jump Ability
-        self.jump_cooldown = random.uniform(2.0, 4.0)
+        self.jump_cooldown = rng.sim.uniform(2.0, 4.0)
         self.is_jumping = False
         self.jump_timer = 0.0
         self.jump_duration = 0.6
@@ -392,13 +346,17 @@ class BlockEnemy(Enemy):
                 cam.add_shake(15)
 
                 impact_range = 2.5
-                if distance(self.wx, self.wy, player.wx, player.wy) < impact_range:
-                    player.health -= 15
-                    angle = math.atan2(player.wy - self.wy, player.wx - self.wx)
-                    player.apply_knockback(math.cos(angle) * 10, math.sin(angle) * 10)
+                if self.broadphase:
+                    hit = self.broadphase.query_radius("player", self.wx, self.wy, impact_range)
+                else:
+                    hit = [player] if distance(self.wx, self.wy, player.wx, player.wy) < impact_range else []
+                for target in hit:
+                    target.health -= 15
+                    angle = math.atan2(target.wy - self.wy, target.wx - self.wx)
+                    target.apply_knockback(math.cos(angle) * 10, math.sin(angle) * 10)
                     self.vm.add_text(sx, sy - 50, "SMASH!", (255, 50, 50), 1.0, 30)
 
-                self.jump_cooldown = random.uniform(3.0, 5.0)
+                self.jump_cooldown = rng.sim.uniform(3.0, 5.0)
 
         else:
             self.jump_cooldown -= dt
@@ -445,13 +403,16 @@ class SpikeEnemy(Enemy):
         self.ghost_timer = 0
         self.dash_cooldown = 2.0
 
+    def think(self, player, grid, far=False):
+        pass  # Wanders at random and dashes on a timer: nothing to decide
+
     def update(self, dt, player, grid, bullets, cam):
         # 30% Chance to Dash Logic
         if not self.dash_active:
             self.dash_cooldown -= dt
             if self.dash_cooldown <= 0:
-                self.dash_cooldown = random.uniform(2.0, 4.0)
-                if random.random() < 0.30:  # 30% Chance
+                self.dash_cooldown = rng.sim.uniform(2.0, 4.0)
+                if rng.sim.random() < 0.30:  # 30% Chance
                     self.dash_active = True
                     self.dash_timer = 0.5  # Dash duration
                     self.speed = self.base_speed * 3.5  # Super fast
@@ -474,7 +435,7 @@ class SpikeEnemy(Enemy):
 
             # Wind Particles
             sx, sy = cam.world_to_screen(self.wx, self.wy)
-            self.vm.add_particle(sx + random.randint(-10, 10), sy + random.randint(-10, 10), (200, 255, 255))
+            self.vm.add_particle(sx + rng.fx.randint(-10, 10), sy + rng.fx.randint(-10, 10), (200, 255, 255))
 
             if self.dash_timer <= 0:
                 self.dash_active = False
@@ -498,8 +459,8 @@ class SpikeEnemy(Enemy):
     def move_towards(self, dx, dy, dist, dt, grid):
         self.move_timer -= dt
         if self.move_timer <= 0:
-            self.move_timer = random.uniform(0.3, 0.8)
-            angle = random.uniform(0, 6.28)
+            self.move_timer = rng.sim.uniform(0.3, 0.8)
+            angle = rng.sim.uniform(0, 6.28)
             self.move_dir = (math.cos(angle), math.sin(angle))
 
         vx = self.move_dir[0] * self.speed * dt
@@ -539,6 +500,20 @@ class HexBoss(Enemy):
         self.current_stage = 1
         self.phase = "IDLE"
 
+    def think(self, player, grid, far=False):
+        super().think(player, grid, far)
+
+        # FIX: ONLY PICK NEW PATTERN IF IDLE
+        if self.phase == "IDLE" and self.shoot_timer <= 0:
+            # Pick a pattern
+            if rng.sim.random() < 0.6:
+                self.phase = "RAPID"
+                self.shoot_timer = 0.1
+                self.burst_count = 10
+            else:
+                self.phase = "NOVA"
+                self.shoot_timer = 2.0
+
     def update(self, dt, player, grid, bullets, cam):
         super().update(dt, player, grid, bullets, cam)
 
@@ -555,17 +530,6 @@ class HexBoss(Enemy):
 
         self.shoot_timer -= dt
 
-        # FIX: ONLY PICK NEW PATTERN IF IDLE
-        if self.phase == "IDLE" and self.shoot_timer <= 0:
-            # Pick a pattern
-            if random.random() < 0.6:
-                self.phase = "RAPID"
-                self.shoot_timer = 0.1
-                self.burst_count = 10
-            else:
-                self.phase = "NOVA"
-                self.shoot_timer = 2.0
-
         if self.phase == "RAPID":
             if self.shoot_timer <= 0:
                 self.shoot_timer = 0.15
@@ -573,13 +537,11 @@ class HexBoss(Enemy):
 
                 dx = player.wx - self.wx
                 dy = player.wy - self.wy
-                angle = math.atan2(dy, dx) + random.uniform(-0.2, 0.2)
+                angle = math.atan2(dy, dx) + rng.sim.uniform(-0.2, 0.2)
                 bx = math.cos(angle)
                 by = math.sin(angle)
 
-                b = Bullet(self.wx, self.wy, bx, by, 7.0, 15, 0, (255, 0, 255), self.uid)
-                b.radius = 8
-                bullets.append(b)
+                bullets.spawn(self.wx, self.wy, bx, by, 7.0, 15, 0, (255, 0, 255), self.uid, radius=8)
 
                 if self.burst_count <= 0:
                     self.phase = "IDLE"
@@ -593,9 +555,7 @@ class HexBoss(Enemy):
                     angle = (6.28 / 12) * i
                     bx = math.cos(angle)
                     by = math.sin(angle)
-                    b = Bullet(self.wx, self.wy, bx, by, 5.0, 20, 0, (200, 100, 255), self.uid)
-                    b.radius = 6
-                    bullets.append(b)
+                    bullets.spawn(self.wx, self.wy, bx, by, 5.0, 20, 0, (200, 100, 255), self.uid, radius=6)
 
     def fire_spread(self, bullets, player, count, spread):
         dx = player.wx - self.wx
@@ -603,11 +563,10 @@ class HexBoss(Enemy):
         base_ang = math.atan2(dy, dx)
 
         for _ in range(count):
-            ang = base_ang + random.uniform(-spread, spread)
+            ang = base_ang + rng.sim.uniform(-spread, spread)
             bx = math.cos(ang)
             by = math.sin(ang)
-            b = Bullet(self.wx, self.wy, bx, by, 8.0, 15, 0, (255, 50, 255), self.uid)
-            bullets.append(b)
+            bullets.spawn(self.wx, self.wy, bx, by, 8.0, 15, 0, (255, 50, 255), self.uid)
 
     def draw(self, surf, cam):
         sx, sy = cam.world_to_screen(self.wx, self.wy)
@@ -642,29 +601,24 @@ class Drone:
         self.rotation_speed = 2.0
         self.wx = 0
         self.wy = 0
+        self.prev_wx = 0
+        self.prev_wy = 0
         self.last_shot = 0
         self.fire_rate = 2.0
         self.damage = 5
 
-    def update(self, dt, enemies, bullet_list):
+    def update(self, dt, broadphase, bullets):
         self.angle_offset += self.rotation_speed * dt
         self.wx = self.player.wx + math.cos(self.angle_offset) * self.dist
         self.wy = self.player.wy + math.sin(self.angle_offset) * self.dist
         self.last_shot += dt
         if self.last_shot >= 1.0 / self.fire_rate:
-            closest = None
-            min_d = 10.0
-            for e in enemies:
-                d = distance(self.wx, self.wy, e.wx, e.wy)
-                if d < min_d:
-                    min_d = d
-                    closest = e
+            closest = broadphase.nearest("enemy", self.wx, self.wy, 10.0)
             if closest:
                 self.last_shot = 0
                 dx = closest.wx - self.wx
                 dy = closest.wy - self.wy
-                b = Bullet(self.wx, self.wy, dx, dy, 10.0, self.damage, 0, (100, 255, 100), self.player.uid)
-                bullet_list.append(b)
+                bullets.spawn(self.wx, self.wy, dx, dy, 10.0, self.damage, 0, (100, 255, 100), self.player.uid)
 
     def draw(self, surf, cam):
         sx, sy = cam.world_to_screen(self.wx, self.wy)
@@ -725,7 +679,7 @@ class Player(Entity):
             return True
         return False
 
-    def update(self, dt, enemies, bullets, grid, vm):
+    def update(self, dt, broadphase, bullets, grid, vm):
         self.physics_update(dt, grid)
         if self.dash_cooldown > 0: self.dash_cooldown -= dt
         if self.ultimate_active:
@@ -752,7 +706,7 @@ class Player(Entity):
 
         self.last_shot += dt
         self.anim_timer += dt * 5
-        for d in self.drones: d.update(dt, enemies, bullets)
+        for d in self.drones: d.update(dt, broadphase, bullets)
 
     def attempt_dash(self):
         if self.dash_cooldown <= 0 and not self.is_dashing:
@@ -764,7 +718,8 @@ class Player(Entity):
             return True
         return False
 
-    def shoot(self, target_wx, target_wy, vm):
+    def shoot(self, target_wx, target_wy, vm, bullets):
+        """Fires into `bullets` (the player's BulletArray). Returns how many shots left the gun."""
         fire_rate = self.stats["fire_rate"]
         cooldown_mod = 1.0
         recoil_force = 0.0
@@ -789,9 +744,9 @@ class Player(Entity):
                 cooldown_mod = 2.5
                 recoil_force = 6.0
 
-        if self.last_shot < (1.0 / fire_rate): return []
+        if self.last_shot < (1.0 / fire_rate): return 0
         self.last_shot = 0 - (1.0 / fire_rate) * (cooldown_mod - 1.0)
-        bullets = []
+        before = bullets.count
         dx = target_wx - self.wx
         dy = target_wy - self.wy
         base_angle = math.atan2(dy, dx)
@@ -807,14 +762,12 @@ class Player(Entity):
                 spread = 0.6
                 color = (255, 50, 0)
             for _ in range(pellets):
-                angle = base_angle + random.uniform(-spread, spread)
+                angle = base_angle + rng.sim.uniform(-spread, spread)
                 bx = math.cos(angle)
                 by = math.sin(angle)
-                spd = self.stats["bullet_speed"] * random.uniform(0.8, 1.1)
+                spd = self.stats["bullet_speed"] * rng.sim.uniform(0.8, 1.1)
                 dmg = self.stats["damage"] * 0.6
-                b = Bullet(self.wx, self.wy, bx, by, spd, dmg, 0, color, self.uid)
-                b.lifetime = 0.6
-                bullets.append(b)
+                bullets.spawn(self.wx, self.wy, bx, by, spd, dmg, 0, color, self.uid, lifetime=0.6)
         elif self.weapon_type == "sniper":
             bx = math.cos(base_angle)
             by = math.sin(base_angle)
@@ -827,17 +780,15 @@ class Player(Entity):
                 dmg *= 2.0
                 spd *= 1.5
                 col = (0, 255, 255)
-            b = Bullet(self.wx, self.wy, bx, by, spd, dmg, pierce, col, self.uid)
-            bullets.append(b)
+            bullets.spawn(self.wx, self.wy, bx, by, spd, dmg, pierce, col, self.uid)
         else:
-            angle = base_angle + random.uniform(-self.stats["spread"], self.stats["spread"])
-            if self.ultimate_active: angle = random.uniform(0, 6.28)
+            angle = base_angle + rng.sim.uniform(-self.stats["spread"], self.stats["spread"])
+            if self.ultimate_active: angle = rng.sim.uniform(0, 6.28)
             bx = math.cos(angle)
             by = math.sin(angle)
-            b = Bullet(self.wx, self.wy, bx, by, self.stats["bullet_speed"], self.stats["damage"],
-                       int(self.stats["pierce"]), (255, 255, 150), self.uid)
-            bullets.append(b)
-        return bullets
+            bullets.spawn(self.wx, self.wy, bx, by, self.stats["bullet_speed"], self.stats["damage"],
+                          int(self.stats["pierce"]), (255, 255, 150), self.uid)
+        return bullets.count - before
 
     def draw(self, surf, cam):
         sx, sy = cam.world_to_screen(self.wx, self.wy)
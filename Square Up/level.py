@@ -0,0 +1,129 @@
+# level.py
+import math
+import collections
+
+# ==========================================
+# LEVEL GRID (ROWS + FLAT LOOKUP FIELDS)
+# ==========================================
+
+# Bits of a 3x3 `near` mask covering the chosen rows / columns (3-bit selections)
+ROW_BITS = [sum(0b111 << (3 * r) for r in range(3) if sel >> r & 1) for sel in range(8)]
+COL_BITS = [sum(0b001001001 << c for c in range(3) if sel >> c & 1) for sel in range(8)]
+
+
+class LevelGrid(list):
+    """
+    The map as the usual list of rows (grid[y][x], 1 = wall, 0 = floor),
+    plus flat fields built once when the level is made:
+      solid - bytearray of the map with a one-tile solid border all round,
+              so point and neighbour tests need no bounds checks.
+      clear - per tile of `solid`, the Chebyshev distance (in tiles) to the
+              nearest solid tile, border included (0 on walls). Anything
+              reaching at most r tiles from its centre tile is clear of
+              walls when clear > r.
+      near  - per map tile, a 9-bit mask of which tiles of its 3x3
+              neighbourhood are solid (bit row * 3 + col).
+    Padded index of tile (x, y): (y + 1) * stride + x + 1.
+    Rows must not be edited afterwards without calling rebuild().
+    """
+
+    def __init__(self, rows):
+        super().__init__(rows)
+        self.rebuild()
+
+    def rebuild(self):
+        w = self.w = len(self[0])
+        h = self.h = len(self)
+        stride = self.stride = w + 2
+        solid = bytearray(b"\x01") * (stride * (h + 2))
+        for y, row in enumerate(self):
+            base = (y + 1) * stride + 1
+            solid[base:base + w] = bytes(row)
+        self.solid = solid
+
+        # Multi-source BFS (8 neighbours) outwards from every solid tile
+        clear = bytearray(b"\xff") * len(solid)
+        queue = collections.deque()
+        for i, s in enumerate(solid):
+            if s:
+                clear[i] = 0
+                queue.append(i)
+        steps = (-stride - 1, -stride, -stride + 1, -1, 1, stride - 1, stride, stride + 1)
+        size = len(solid)
+        while queue:
+            i = queue.popleft()
+            d = clear[i] + 1
+            if d > 254: continue
+            for step in steps:
+                n = i + step
+                if 0 <= n < size and clear[n] > d:
+                    clear[n] = d
+                    queue.append(n)
+        self.clear = clear
+
+        near = [0] * len(solid)
+        for y in range(h):
+            for x in range(w):
+                i = (y + 1) * stride + x + 1
+                mask = 0
+                for bit, step in enumerate(steps[:4] + (0,) + steps[4:]):
+                    if solid[i + step]:
+                        mask |= 1 << bit
+                near[i] = mask
+        self.near = near
+
+    def index(self, ix, iy):
+        return (iy + 1) * self.stride + ix + 1
+
+    def blocked(self, wx, wy):
+        """True if the point is inside a wall or off the map (same as utils.check_grid_collision)."""
+        ix = int(wx)
+        iy = int(wy)
+        if ix < -1 or ix > self.w or iy < -1 or iy > self.h:
+            return True
+        return self.solid[(iy + 1) * self.stride + ix + 1] == 1
+
+    def area_blocked(self, min_x, max_x, min_y, max_y):
+        """True if any tile under the box is a wall or off the map."""
+        start_x = int(math.floor(min_x))
+        end_x = int(math.ceil(max_x))
+        start_y = int(math.floor(min_y))
+        end_y = int(math.ceil(max_y))
+        if end_x <= start_x or end_y <= start_y:
+            return False
+        if start_x < 0 or end_x > self.w or start_y < 0 or end_y > self.h:
+            return True
+        solid, stride = self.solid, self.stride
+        for y in range(start_y, end_y):
+            base = (y + 1) * stride + 1
+            if 1 in solid[base + start_x:base + end_x]:
+                return True
+        return False
+
+    def box_blocked(self, wx, wy, margin):
+        """
+        area_blocked() for the box of half-size `margin` around (wx, wy), as
+        lookups: nothing near in the distance field means free, otherwise the
+        box's fractional position picks which neighbours it overlaps.
+        """
+        if margin >= 1.0 or not (0 <= wx < self.w and 0 <= wy < self.h):
+            return self.area_blocked(wx - margin, wx + margin, wy - margin, wy + margin)
+        ix = int(wx)
+        iy = int(wy)
+        i = (iy + 1) * self.stride + ix + 1
+        if self.clear[i] > 1:
+            return False
+        fx = wx - ix
+        fy = wy - iy
+        # Centre row / column always; the left / right (top / bottom) one if the box pokes into it
+        cols = 2 | (fx < margin) | ((fx > 1 - margin) << 2)
+        rows = 2 | (fy < margin) | ((fy > 1 - margin) << 2)
+        return self.near[i] & ROW_BITS[rows] & COL_BITS[cols] != 0
+
+    def clearance(self, wx, wy):
+        """Tiles from the tile under (wx, wy) to the nearest wall (0 = in a wall / off the map)."""
+        ix = int(wx)
+        iy = int(wy)
+        if ix < -1 or ix > self.w or iy < -1 or iy > self.h:
+            return 0
+        return self.clear[(iy + 1) * self.stride + ix + 1]
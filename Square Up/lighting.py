@@ -0,0 +1,50 @@
+# lighting.py
+import math
+import collections
+import pygame
+from config import *
+
+# ==========================================
+# LIGHT SPRITE CACHE
+# ==========================================
+
+class LightCache:
+    """
+    Pre-scaled copies of the light gradient texture.
+    Requested sizes are snapped to geometric buckets (each ~6% bigger than
+    the last), so every bullet/orb/particle light reuses the same few sprites
+    instead of rescaling the full texture. Least recently used sizes are
+    dropped once the sprites' pixels take more than `max_bytes` (sizes grow
+    with zoom, so a sprite count alone wouldn't bound the memory).
+    """
+
+    def __init__(self, texture, ratio=1.06, max_bytes=LIGHT_CACHE_BYTES):
+        self.texture = texture
+        self.log_ratio = math.log(ratio)
+        self.max_bytes = max_bytes
+        self.nbytes = 0  # Pixel memory of the cached sprites
+        self.sprites = collections.OrderedDict()  # bucket -> scaled surface
+        self.misses = 0  # Number of actual rescales (for debugging)
+
+    def bucket_size(self, size):
+        """The pre-scaled size a requested size snaps to."""
+        bucket = round(math.log(size) / self.log_ratio)
+        return bucket, max(1, int(round(math.exp(bucket * self.log_ratio))))
+
+    def get(self, size):
+        bucket, snapped = self.bucket_size(size)
+        sprite = self.sprites.get(bucket)
+        if sprite is None:
+            self.misses += 1
+            sprite = pygame.transform.smoothscale(self.texture, (snapped, snapped))
+            self.sprites[bucket] = sprite
+            self.nbytes += self.sprite_bytes(sprite)
+            while self.nbytes > self.max_bytes and len(self.sprites) > 1:  # Always keep the one just made
+                self.nbytes -= self.sprite_bytes(self.sprites.popitem(last=False)[1])
+        else:
+            self.sprites.move_to_end(bucket)
+        return sprite
+
+    @staticmethod
+    def sprite_bytes(sprite):
+        return sprite.get_width() * sprite.get_height() * sprite.get_bytesize()
@@ -9,28 +9,55 @@ CHANGELOG:
 - Bullets and Explosions cast smooth light
 """
 
+import os
 import math
-import random
+import time
+import argparse
 import pygame
 from pygame.locals import *
 
 # Module Imports
+import rng
 from config import *
-from utils import check_grid_collision, distance, clamp
+from utils import distance, clamp, SightCache
 from camera import Camera
-from visuals import VisualManager
-from entities import Player, Grenade, HexBoss, SpikeEnemy, BlockEnemy, OrbEnemy, EnergyOrb
-from map_gen import generate_map, create_wall_entities, draw_floor_grid
+from visuals import VisualManager, text_cache
+from entities import Player, Grenade, HexBoss, SpikeEnemy, BlockEnemy, OrbEnemy, orb_pool
+from bullets import BulletManager
+from map_gen import generate_map, FloorRenderer, WallRenderer
 from ui import Button
+from spatial import Broadphase
+from pathfinding import make_path_field
+from lighting import LightCache
+from depth import DepthSorter
+from culling import Culler
+from profiler import Profiler, ProfilerOverlay
+from preload import LevelPreloader
+from ai import AIScheduler
+from replay import InputLog, state_digest
 
 
 class Game:
-    def __init__(self):
+    # Timed stages shown on the profiler overlay (F3), in loop order
+    PROFILED_STAGES = ("input", "player", "ai", "collisions", "vm",
+                       "floor", "entities", "vignette", "hud", "render")
+
+    def __init__(self, headless=False, seed=None, record=False, god_mode=False, deterministic=False):
+        # Headless: no real window (SDL dummy driver), for benchmarks & batch runs
+        self.headless = headless
+        self.record = record  # Keep every tick's input so the game can be saved as a replay (F5)
+        self.god_mode = god_mode  # Player health refilled every tick (benchmarks)
+        # Same seed + same input = same game: no wall-clock limits in the sim (recording, replays, benchmarks)
+        self.deterministic = deterministic or record
+        if headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
         pygame.init()
         self.screen = pygame.display.set_mode((SCREEN_W, SCREEN_H))
         pygame.display.set_caption("Square Up - v8.1 Smooth Lighting")
 
         self.clock = pygame.time.Clock()
+        self.profiler = Profiler()
 
         # --- FONTS ---
         self.font_ui = pygame.font.SysFont("Verdana", 14, bold=True)
@@ -40,17 +67,28 @@ class Game:
         self.intro_font = pygame.font.SysFont("Impact", 80)
         self.intro_sub_font = pygame.font.SysFont("Verdana", 30, bold=True)
         self.shop_font = pygame.font.SysFont("Verdana", 30, bold=True)
+        self.profiler_overlay = ProfilerOverlay(pygame.font.SysFont("Consolas,Courier New,monospace", 13),
+                                                self.PROFILED_STAGES)
 
         # --- LIGHTING SURFACE ---
         # We create a smooth radial gradient "Texture" once to reuse
         self.light_radius = 700
         self.light_surf = self.generate_light_texture(self.light_radius)
+        # Lights are blitted from pre-scaled, size-bucketed copies of that texture
+        self.light_cache = LightCache(self.light_surf)
 
         # The darkness layer (No alpha needed for BLEND_MULT)
-        self.fog = pygame.Surface((SCREEN_W, SCREEN_H))
+        self.set_light_quality(LIGHT_QUALITY)
+
+        # Persistent overlays (filled once, only their alpha changes per frame)
+        self.flash_surf = pygame.Surface((SCREEN_W, SCREEN_H))
+        self.flash_surf.fill((255, 0, 0))
+        self.shop_overlay = pygame.Surface((SCREEN_W, 250))
+        self.shop_overlay.fill((0, 0, 0))
+        self.shop_overlay.set_alpha(180)
 
         self.damage_alpha = 0.0
-        self.reset_game()
+        self.reset_game(seed)
 
     def generate_light_texture(self, radius):
         """Generates a smooth white-to-black radial gradient"""
@@ -67,22 +105,48 @@ class Game:
             pygame.draw.circle(surf, (intensity, intensity, intensity), center, r)
         return surf
 
-    def reset_game(self):
+    def set_light_quality(self, quality):
+        """
+        Lights are accumulated into a buffer 1/quality the size of the screen,
+        then smooth-scaled up once before the multiply. The gradients are soft
+        enough that half/quarter resolution looks the same, for far fewer pixels.
+        """
+        self.light_quality = quality
+        self.fog = pygame.Surface((SCREEN_W // quality, SCREEN_H // quality))
+        # Full-screen target for the upscale (only needed below full resolution)
+        self.fog_full = pygame.Surface((SCREEN_W, SCREEN_H)) if quality > 1 else None
+
+    def reset_game(self, seed=None):
+        # Every gameplay random number comes from this seed (see rng.py)
+        self.seed = seed if seed is not None else rng.new_seed()
+        rng.seed(self.seed)
+        self.input_log = InputLog(self.seed, self.god_mode) if self.record else None
+        self.pending_actions = []  # Clicks / key presses waiting for the next sim tick
+
         self.level = 1
+        # A new game starts with nothing preloaded (a build left over from the last game is dropped)
+        self.preloader = LevelPreloader()
         self.player = Player()
         self.cam = Camera(SCREEN_W, SCREEN_H)
-        self.cam.set_target(self.player.wx, self.player.wy)
-        self.cam.focus_wx = self.player.wx
-        self.cam.focus_wy = self.player.wy
+        self.cam.snap_to(self.player.wx, self.player.wy)
 
         self.vm = VisualManager()
         self.map_grid = generate_map(MAP_W, MAP_H, self.level)
-        self.walls = create_wall_entities(self.map_grid, self.level)
+        self.walls = WallRenderer(self.map_grid, self.level)
+        self.floor = FloorRenderer(MAP_W, MAP_H)
+        self.depth_sorter = DepthSorter()
+        self.culler = Culler()
 
-        self.bullets = []
+        self.bullets = BulletManager()
         self.enemies = []
         self.grenades = []
         self.orbs = []
+        self.broadphase = Broadphase(("player", "enemy", "orb"))  # Proximity queries, by category
+        self.flow_field = make_path_field()
+        self.sight_cache = SightCache()
+        self.ai = AIScheduler()
+        if self.deterministic:
+            self.ai.budget = None  # A wall-clock AI budget would make the game depend on machine load
 
         self.wave_active = True
         self.enemies_spawned = 0
@@ -185,28 +249,19 @@ class Game:
         self.enemies_spawned = 0
         self.enemies_killed_in_wave = 0
         self.enemies_to_spawn = 10 + int(self.level * 2.5)
-        self.orbs = []
+        orb_pool.release_all(self.orbs)
 
-        self.map_grid = generate_map(MAP_W, MAP_H, self.level)
-        self.walls = create_wall_entities(self.map_grid, self.level)
-
-        margin = self.player.radius
-        if self.player.check_area_collision(self.player.wx - margin, self.player.wx + margin, self.player.wy - margin,
-                                            self.player.wy + margin, self.map_grid):
-            px, py = int(self.player.wx), int(self.player.wy)
-            found_safe = False
-            for r in range(1, 10):
-                for dy in range(-r, r + 1):
-                    for dx in range(-r, r + 1):
-                        if abs(dx) != r and abs(dy) != r: continue
-                        tx, ty = px + dx, py + dy
-                        if 0 <= tx < MAP_W and 0 <= ty < MAP_H and self.map_grid[ty][tx] == 0:
-                            self.player.wx, self.player.wy = tx + 0.5, ty + 0.5
-                            found_safe = True
-                            break
-                    if found_safe: break
-                if found_safe: break
-            if not found_safe: self.player.wx, self.player.wy = MAP_W / 2, MAP_H / 2
+        # Normally built in the background while the shop was open: just swap it in
+        target = (int(self.player.wx), int(self.player.wy))
+        prepared = self.preloader.take(self.level, self.cam, target)
+        self.map_grid = prepared.grid
+        self.walls = prepared.walls
+        self.floor = prepared.floor
+        self.flow_field = prepared.flow_field
+
+        if self.map_grid.box_blocked(self.player.wx, self.player.wy, self.player.radius):
+            self.player.wx, self.player.wy = prepared.safe_spot(self.player.wx, self.player.wy)
+            self.player.prev_wx, self.player.prev_wy = self.player.wx, self.player.wy  # Don't slide to the new spot
 
         self.vm.add_text(SCREEN_W / 2, SCREEN_H / 2 - 100, f"LEVEL {self.level} STARTED", (255, 255, 100), 2.0, size=30)
         self.cam.add_shake(10)
@@ -214,14 +269,14 @@ class Game:
     def spawn_enemy(self):
         attempts = 0
         while attempts < 20:
-            ix, iy = random.randint(1, MAP_W - 2), random.randint(1, MAP_H - 2)
+            ix, iy = rng.sim.randint(1, MAP_W - 2), rng.sim.randint(1, MAP_H - 2)
             if self.map_grid[iy][ix] == 0:
                 wx, wy = ix + 0.5, iy + 0.5
                 if distance(wx, wy, self.player.wx, self.player.wy) < 5.0:
                     attempts += 1
                     continue
 
-                r = random.random()
+                r = rng.sim.random()
                 e = None
                 if self.level % 5 == 0 and self.enemies_spawned == self.enemies_to_spawn - 1:
                     e = HexBoss(wx, wy, self.level, self.vm)
@@ -232,6 +287,9 @@ class Game:
                 else:
                     e = OrbEnemy(wx, wy, self.level, self.vm)
 
+                e.flow_field = self.flow_field
+                e.sight_cache = self.sight_cache
+                e.broadphase = self.broadphase
                 self.enemies.append(e)
                 self.enemies_spawned += 1
                 return
@@ -241,27 +299,29 @@ class Game:
         self.cam.add_shake(15)
         sx, sy = self.cam.world_to_screen(gx, gy)
         self.vm.add_explosion(sx, sy)
-        for e in self.enemies:
-            if distance(gx, gy, e.wx, e.wy) < radius_world:
-                e.take_damage(damage)
+        for e in self.broadphase.query_radius("enemy", gx, gy, radius_world):
+            e.take_damage(damage)
 
     # --- SMOOTH LIGHTING SYSTEM ---
-    def draw_vignette(self):
+    def draw_vignette(self, alpha=1.0):
         if self.intro_active: return
 
         # 1. Fill the fog layer with DARKNESS (Ambient Light)
         # Use (5, 5, 10) for extremely dark, tactical feel
         self.fog.fill((5, 5, 12))
 
+        q = self.light_quality
+
         # Helper to blit light cleanly
         def draw_light(sx, sy, scale):
-            # Scale the pre-generated smooth gradient
-            size = int(self.light_radius * 2 * scale)
+            # Scale the pre-generated smooth gradient (and down to the light buffer's resolution)
+            size = int(self.light_radius * 2 * scale / q)
             if size <= 0: return
+            sx, sy = sx / q, sy / q
 
-            # Optimization: Only scale if size changed (simple cache could go here)
-            # For now, transform.scale is fast enough for low object counts
-            scaled_light = pygame.transform.scale(self.light_surf, (size, size))
+            # Optimization: Reuse a cached copy of the nearest pre-scaled size
+            scaled_light = self.light_cache.get(size)
+            size = scaled_light.get_width()
 
             # Blit using ADD: This ADDS light to the darkness
             # Center the light on the coordinate
@@ -272,26 +332,29 @@ class Game:
         draw_light(px, py, self.cam.zoom * 1.0)  # 1.0 = Normal flashlight size
 
         # 3. Draw Lights for Bullets (Glowing trails!)
-        for b in self.bullets:
-            bx, by = self.cam.world_to_screen(b.wx, b.wy)
+        # Project all bullets in one batch instead of one world_to_screen call each
+        for bx, by in self.cam.project_points(self.bullets.positions(alpha)):
             draw_light(bx, by, self.cam.zoom * 0.15)  # Small glow for bullets
 
         # 4. Draw Lights for Orbs
-        for o in self.orbs:
-            ox, oy = self.cam.world_to_screen(o.wx, o.wy)
+        for ox, oy in self.cam.project_points([(o.wx, o.wy) for o in self.orbs]):
             draw_light(ox, oy, self.cam.zoom * 0.2)
 
         # 5. Draw Lights for Explosions/Fire
-        for p in self.vm.particles:
-            if p.size > 5:
-                # Use particle color to tint the light?
-                # For simplicity in this blend mode, white light reveals the color underneath best.
-                draw_light(p.x, p.y, (p.size / 50.0))
+        for lx, ly, size in self.vm.particles.lights(5):
+            # Use particle color to tint the light?
+            # For simplicity in this blend mode, white light reveals the color underneath best.
+            draw_light(lx, ly, (size / 50.0))
 
         # 6. Apply to Screen using MULTIPLY
         # Darkness (Low RGB) * Screen = Dark
         # Light (High RGB) * Screen = Lit
-        self.screen.blit(self.fog, (0, 0), special_flags=pygame.BLEND_MULT)
+        fog = self.fog
+        if self.fog_full:
+            # Reduced resolution: one smooth upscale, then the same multiply
+            pygame.transform.smoothscale(self.fog, (SCREEN_W, SCREEN_H), self.fog_full)
+            fog = self.fog_full
+        self.screen.blit(fog, (0, 0), special_flags=pygame.BLEND_MULT)
 
     def draw_hud(self):
         if self.intro_active: return
@@ -301,7 +364,7 @@ class Game:
         pct = clamp(self.player.health / self.player.stats["hp_max"], 0, 1)
         pygame.draw.rect(self.screen, (200, 50, 50), (bar_x + 2, bar_y + 2, (bar_w - 4) * pct, bar_h - 4))
         hp_text = f"{int(self.player.health)} / {int(self.player.stats['hp_max'])}"
-        txt_surf = self.font_ui.render(hp_text, True, (255, 255, 255))
+        txt_surf = text_cache.render(self.font_ui, hp_text, (255, 255, 255))
         self.screen.blit(txt_surf, (bar_x + bar_w // 2 - txt_surf.get_width() // 2, bar_y + 4))
 
         ult_w, ult_h = 200, 15
@@ -320,28 +383,28 @@ class Game:
             msg = "ACTIVE!"
         elif self.player.energy < self.player.max_energy:
             msg = f"{int(self.player.energy)}%"
-        u_txt = self.font_ui.render(msg, True, (0, 0, 0))
+        u_txt = text_cache.render(self.font_ui, msg, (0, 0, 0))
         self.screen.blit(u_txt, (bar_x + ult_w // 2 - u_txt.get_width() // 2, ult_y - 2))
 
         lvl_w, lvl_h = 100, 15
         lvl_y = ult_y + ult_h + 5
         pygame.draw.rect(self.screen, (30, 30, 30), (bar_x, lvl_y, lvl_w, lvl_h))
         pygame.draw.rect(self.screen, (50, 200, 50), (bar_x + 2, lvl_y + 2, lvl_w - 4, lvl_h - 4))
-        lvl_txt = self.font_ui.render(f"LV. {self.level}", True, (255, 255, 255))
+        lvl_txt = text_cache.render(self.font_ui, f"LV. {self.level}", (255, 255, 255))
         self.screen.blit(lvl_txt, (bar_x + 5, lvl_y - 2))
 
         coin_y = lvl_y + lvl_h + 10
         pygame.draw.circle(self.screen, COL_MONEY, (bar_x + 10, coin_y + 10), 10)
-        money_txt = self.font_big.render(f"{int(self.player.money)}", True, COL_MONEY)
+        money_txt = text_cache.render(self.font_big, f"{int(self.player.money)}", COL_MONEY)
         self.screen.blit(money_txt, (bar_x + 25, coin_y))
 
         cx = SCREEN_W // 2
-        wave_txt = self.font_wave.render(f"WAVE {self.level}", True, (255, 255, 255))
+        wave_txt = text_cache.render(self.font_wave, f"WAVE {self.level}", (255, 255, 255))
         self.screen.blit(wave_txt, (cx - wave_txt.get_width() // 2, 20))
 
         remaining_real = (self.enemies_to_spawn - self.enemies_spawned) + len(self.enemies)
         if not self.wave_active: remaining_real = 0
-        enemy_txt = self.font_enemy_count.render(f"{remaining_real}", True, (255, 50, 50))
+        enemy_txt = text_cache.render(self.font_enemy_count, f"{remaining_real}", (255, 50, 50))
         self.screen.blit(enemy_txt, (cx - enemy_txt.get_width() // 2, 55))
 
         dash_x = bar_x + bar_w + 10
@@ -363,18 +426,15 @@ class Game:
             self.screen.blit(s, (dash_x, dash_y + (dash_size - fill_h)))
 
         if not self.wave_active:
-            overlay = pygame.Surface((SCREEN_W, 250))
-            overlay.fill((0, 0, 0))
-            overlay.set_alpha(180)
-            self.screen.blit(overlay, (0, SCREEN_H - 250))
-            msg = self.shop_font.render("SHOP OPEN - Press ENTER", True, (100, 255, 100))
+            self.screen.blit(self.shop_overlay, (0, SCREEN_H - 250))
+            msg = text_cache.render(self.shop_font, "SHOP OPEN - Press ENTER", (100, 255, 100))
             self.screen.blit(msg, (SCREEN_W // 2 - msg.get_width() // 2, SCREEN_H - 290))
             for b in self.buttons: b.draw(self.screen, self.font_ui, self.player.money)
 
     def draw_game_over(self):
         self.screen.fill((20, 0, 0))
-        txt = self.intro_font.render("GAME OVER", True, (255, 50, 50))
-        restart = self.font_big.render("Press R to Restart", True, (255, 255, 255))
+        txt = text_cache.render(self.intro_font, "GAME OVER", (255, 50, 50))
+        restart = text_cache.render(self.font_big, "Press R to Restart", (255, 255, 255))
         cx, cy = SCREEN_W // 2, SCREEN_H // 2
         self.screen.blit(txt, (cx - txt.get_width() // 2, cy - 50))
         self.screen.blit(restart, (cx - restart.get_width() // 2, cy + 50))
@@ -384,8 +444,8 @@ class Game:
         self.screen.fill((10, 10, 15))
         cx, cy = SCREEN_W // 2, SCREEN_H // 2
 
-        shake_x = random.randint(-self.intro_cam_shake, self.intro_cam_shake)
-        shake_y = random.randint(-self.intro_cam_shake, self.intro_cam_shake)
+        shake_x = rng.fx.randint(-self.intro_cam_shake, self.intro_cam_shake)
+        shake_y = rng.fx.randint(-self.intro_cam_shake, self.intro_cam_shake)
         cx += shake_x
         cy += shake_y
 
@@ -438,12 +498,322 @@ class Game:
             sub_y = ball_y + 45
             self.screen.blit(sub_txt, (sub_x, sub_y))
 
+    def read_input(self):
+        """
+        Samples keyboard & mouse once per frame into what the simulation needs.
+        Movement is already turned into world space for the current view.
+        """
+        keys = pygame.key.get_pressed()
+        mx, my = pygame.mouse.get_pos()
+        input_x, input_y = 0, 0
+        if keys[K_w] or keys[K_UP]: input_y = -1
+        if keys[K_s] or keys[K_DOWN]: input_y = 1
+        if keys[K_a] or keys[K_LEFT]: input_x = -1
+        if keys[K_d] or keys[K_RIGHT]: input_x = 1
+
+        idx = self.cam.rotation_index % 4
+        vx, vy = 0, 0
+        if idx == 0:
+            vx, vy = input_x, input_y
+        elif idx == 1:
+            vx, vy = input_y, -input_x
+        elif idx == 2:
+            vx, vy = -input_x, -input_y
+        elif idx == 3:
+            vx, vy = -input_y, input_x
+
+        return {
+            "move": (vx, vy),
+            "dash": bool(keys[K_LSHIFT]),
+            "fire": bool(pygame.mouse.get_pressed()[0]) and (self.wave_active or my < SCREEN_H - 250),
+            "aim": self.cam.screen_to_world(mx, my),
+            "actions": self.pending_actions,
+        }
+
+    def simulate(self, dt, inp):
+        """One fixed simulation step: movement, AI, spawning and collisions."""
+        if self.input_log is not None:
+            inp = self.input_log.record(inp)  # Simulate exactly what a replay will see
+        if self.god_mode:
+            self.player.health = self.player.stats["hp_max"]
+        prof = self.profiler
+        with prof.scope("player"):
+            self.apply_actions(inp.get("actions", ()))
+            self.update_player(dt, inp)
+
+        with prof.scope("spawning"):
+            self.update_spawning(dt)
+
+        with prof.scope("projectiles"):
+            # All bullets move, age and hit walls in one pass over the arrays
+            for wx, wy in self.bullets.update(dt, self.map_grid):
+                sx, sy = self.cam.world_to_screen(wx, wy)
+                self.vm.add_particle(sx, sy, (200, 200, 200))
+            for g in self.grenades:
+                g.update(dt, self.map_grid)
+                if g.exploded: self.handle_explosion(g.x, g.y, 80.0, 4.0)
+            self.grenades = [g for g in self.grenades if not g.exploded]
+
+        with prof.scope("ai"):
+            self.sight_cache.clear()
+            # Everyone moves; only the enemies due a decision think (PASS SELF.CAM HERE for earthquakes)
+            self.ai.update(self.enemies, dt, self.player, self.map_grid, self.bullets.enemy, self.cam)
+            prof.count("ai_thinks", self.ai.thinks)
+
+        with prof.scope("collisions"):
+            self.resolve_collisions(dt)
+
+        self.remove_dead_enemies()
+
+    def apply_actions(self, actions):
+        """
+        One-off commands (shop, next wave, ultimate, grenades), applied at a
+        sim tick like the rest of the input so replays see them at the same point.
+        """
+        for action in actions:
+            name = action[0]
+            if name == "next_level":
+                if not self.wave_active: self.start_next_level()
+            elif name == "ultimate":
+                if self.player.activate_ultimate():
+                    self.vm.add_text(SCREEN_W // 2, SCREEN_H // 2 - 200, "ULTIMATE ACTIVATED!", (0, 255, 255), 2.0, 30)
+                    self.cam.add_shake(20)
+            elif name == "grenade":
+                if self.player.grenade_count > 0:
+                    self.grenades.append(Grenade(self.player.wx, self.player.wy, action[1], action[2]))
+                    self.player.grenade_count -= 1
+            elif name == "buy":
+                if not self.wave_active: self.buttons[int(action[1])].buy(self.player)
+
+    def update_player(self, dt, inp):
+        if inp["dash"]: self.player.attempt_dash()
+        vx, vy = inp["move"]
+        if vx != 0 or vy != 0:
+            l = math.hypot(vx, vy)
+            vx /= l
+            vy /= l
+            speed = self.player.stats["speed"]
+            if self.player.is_dashing: speed *= 3.0
+            self.player.vx = vx * speed
+            self.player.vy = vy * speed
+        else:
+            if not self.player.is_dashing: self.player.vx, self.player.vy = 0, 0
+
+        # Enemies haven't moved yet this tick: index them for drones & grenades
+        bp = self.broadphase
+        bp.sync("enemy", self.enemies)
+        self.player.update(dt, bp, self.bullets.player, self.map_grid, self.vm)
+        bp.sync("player", (self.player,))
+        # One BFS for every enemy, only when the player steps onto a new tile
+        self.flow_field.update((int(self.player.wx), int(self.player.wy)), self.map_grid)
+
+        for orb in self.orbs:
+            orb.update(dt)
+        bp.sync("orb", self.orbs)
+        for orb in bp.query_radius("orb", self.player.wx, self.player.wy, 1.0):
+            orb.lifetime = 0
+            self.player.energy = min(self.player.max_energy, self.player.energy + 10)
+            sx, sy = self.cam.world_to_screen(orb.wx, orb.wy)
+            self.vm.add_particle(sx, sy, (0, 255, 255))
+        orb_pool.compact(self.orbs, lambda o: o.lifetime > 0)
+
+        if inp["fire"]:
+            m_wx, m_wy = inp["aim"]
+            if self.player.shoot(m_wx, m_wy, self.vm, self.bullets.player):
+                if not self.player.ultimate_active:
+                    self.vm.add_casing(self.player.wx, self.player.wy)
+
+    def update_spawning(self, dt):
+        if self.wave_active:
+            if self.enemies_spawned < self.enemies_to_spawn:
+                self.spawn_timer -= dt
+                if self.spawn_timer <= 0:
+                    self.spawn_enemy()
+                    self.spawn_timer = max(0.5, 2.0 - self.level * 0.1)
+            elif len(self.enemies) == 0:
+                self.wave_active = False
+                self.player.money += 50 * self.level
+                # Shop time: build the next level in the background meanwhile
+                self.preloader.start(self.level + 1, self.cam, (int(self.player.wx), int(self.player.wy)))
+
+    def resolve_collisions(self, dt):
+        """Contact damage, bullets vs walls / player / enemies."""
+        # Re-index after movement (only enemies that changed tile); contact damage and bullets query the grid
+        self.broadphase.sync("enemy", self.enemies)
+
+        if not self.player.is_dashing:
+            for e in self.broadphase.query_radius("enemy", self.player.wx, self.player.wy, 0.8):
+                self.player.health -= e.damage_to_player * dt
+                self.damage_alpha = 150.0
+
+        if self.player.health <= 0:
+            self.game_over = True
+            sx, sy = self.cam.world_to_screen(self.player.wx, self.player.wy)
+            self.vm.add_explosion(sx, sy, (255, 0, 0))
+
+        self.hit_player(self.bullets.enemy)
+        # Enemy shots still hurt other enemies, just never the one who fired
+        for side in self.bullets.sides:
+            self.hit_enemies(side)
+
+    def hit_player(self, bullets):
+        px, py = self.player.wx, self.player.wy
+        xs, ys, life = bullets.x, bullets.y, bullets.life
+        for i in range(bullets.count):
+            if life[i] > 0 and distance(px, py, xs[i], ys[i]) < 0.6:
+                self.player.health -= bullets.damage[i]
+                self.damage_alpha = 150.0  # Trigger red flash
+                life[i] = 0  # Destroy bullet
+
+                # Add blood effect
+                sx, sy = self.cam.world_to_screen(px, py)
+                self.vm.add_particle(sx, sy, (255, 0, 0))
+
+    def hit_enemies(self, bullets):
+        xs, ys, life, pierce = bullets.x, bullets.y, bullets.life, bullets.pierce
+        for i in range(bullets.count):
+            if life[i] <= 0: continue
+            bx, by = xs[i], ys[i]
+            owner, hit_list = bullets.owner[i], bullets.hits[i]
+            for e in self.broadphase.query("enemy", bx, by, 0.8):
+                if e.uid == owner: continue
+                if e.uid in hit_list: continue
+                if distance(e.wx, e.wy, bx, by) < 0.8:
+                    damage = bullets.damage[i]
+                    e.take_damage(damage)
+                    hit_list.add(e.uid)
+                    sx, sy = self.cam.world_to_screen(e.wx, e.wy)
+                    self.vm.add_particle(sx, sy, e.color)
+                    self.vm.add_text(sx, sy - 40, str(int(damage)), (255, 255, 255))
+                    e.apply_knockback(bullets.vx[i] * 0.2, bullets.vy[i] * 0.2)
+                    if pierce[i] <= 0:
+                        life[i] = 0
+                        break
+                    else:
+                        pierce[i] -= 1
+
+    def remove_dead_enemies(self):
+        survivors = []
+        for e in self.enemies:
+            if e.dead:
+                self.player.money += e.money_value
+                self.enemies_killed_in_wave += 1
+                self.cam.add_shake(3.0)
+                sx, sy = self.cam.world_to_screen(e.wx, e.wy)
+                self.vm.add_text(sx, sy - 60, f"+${e.money_value}", COL_MONEY)
+                for _ in range(8): self.vm.add_particle(sx, sy, e.color)
+
+                if rng.sim.random() < 1:
+                    self.orbs.append(orb_pool.acquire(e.wx, e.wy))
+            else:
+                survivors.append(e)
+        self.enemies = survivors
+
+    def moving_objects(self):
+        """Everything drawn at a position the simulation moves (for interpolation)."""
+        return [self.player, *self.player.drones, *self.enemies, *self.orbs]
+
+    def snapshot_positions(self):
+        """Remembers where everything is before a sim step."""
+        self.bullets.snapshot()
+        for o in self.moving_objects():
+            o.prev_wx = o.wx
+            o.prev_wy = o.wy
+
+    def interpolate_positions(self, alpha):
+        """
+        Moves everything `alpha` (0..1) of the way from its previous to its
+        current sim position, for drawing between two sim steps.
+        Returns what restore_positions() needs to undo it.
+        """
+        saved = []
+        for o in self.moving_objects():
+            saved.append((o, o.wx, o.wy))
+            o.wx = o.prev_wx + (o.wx - o.prev_wx) * alpha
+            o.wy = o.prev_wy + (o.wy - o.prev_wy) * alpha
+        return saved
+
+    def restore_positions(self, saved):
+        for o, wx, wy in saved:
+            o.wx = wx
+            o.wy = wy
+
+    def update_visuals(self, dt):
+        """Per-frame (not per-sim-step) updates: camera follow and effects."""
+        self.cam.set_target(self.player.wx, self.player.wy)
+        self.cam.update(dt)
+        with self.profiler.scope("vm"):
+            self.vm.update(dt)
+
+    def render(self, dt, alpha):
+        saved = self.interpolate_positions(alpha)
+        self.update_visuals(dt)
+        with self.profiler.scope("render"):
+            self.draw_world(dt, alpha)
+        self.profiler_overlay.draw(self.screen, self.profiler, self.clock.get_fps())
+        self.restore_positions(saved)
+        pygame.display.flip()
+
+    def draw_world(self, dt, alpha):
+        self.screen.fill(COL_BG)
+        # Work out the visible world rectangle once; every draw list is filtered by it
+        cull = self.culler
+        cull.begin(self.cam)
+        prof = self.profiler
+        with prof.scope("floor"):
+            self.floor.draw(self.screen, self.cam, self.level)
+            self.vm.draw_floor(self.screen, self.cam, cull)
+            self.vm.draw_ghosts(self.screen, self.cam, cull)
+
+        with prof.scope("entities"):
+            for orb in cull.visible(self.orbs, "orbs", 0.5): orb.draw(self.screen, self.cam)
+
+            # Only dynamic entities are sorted (incrementally, by depth);
+            # static walls come pre-sorted from the WallRenderer
+            render_list = [self.player]
+            render_list.extend(cull.visible(self.enemies, "enemies", 1.5))
+            render_list = self.depth_sorter.update(render_list, self.cam)
+
+            # DRAW SHADOWS FIRST (so they are under the bodies)
+            for entity in render_list:
+                entity.draw_shadow(self.screen, self.cam)
+
+            # Walls and bodies, interleaved back to front
+            self.walls.draw(self.screen, self.cam, render_list, self.depth_sorter.keys, cull)
+
+            self.bullets.draw(self.screen, self.cam, alpha, cull)
+            for g in self.grenades: g.draw(self.screen, self.cam)
+
+            self.vm.draw_top(self.screen, self.cam, cull)
+
+        with prof.scope("vignette"):
+            self.draw_vignette(alpha)
+
+        if self.damage_alpha > 0:
+            self.flash_surf.set_alpha(int(self.damage_alpha))
+            self.screen.blit(self.flash_surf, (0, 0))
+            self.damage_alpha = max(0, self.damage_alpha - 300 * dt)
+
+        with prof.scope("hud"):
+            self.draw_hud()
+
+        prof.count("enemies", len(self.enemies))
+        prof.count("bullets", len(self.bullets))
+        prof.count("particles", len(self.vm.particles))
+        # Objects left after culling (a wall or entity may take several pygame.draw calls)
+        prof.count("drawn_objects", sum(drawn for drawn, _ in cull.stats.values()))
+        prof.count("culled", sum(culled for _, culled in cull.stats.values()))
+
     def run(self):
         running = True
+        sim_dt = 1.0 / SIM_RATE
+        accumulator = 0.0
         while running:
             dt_ms = self.clock.tick(FPS)
-            dt = dt_ms / 1000.0
+            # Clamp huge frames (window drag, breakpoints) so we don't spiral
+            dt = min(dt_ms / 1000.0, 0.25)
             mx, my = pygame.mouse.get_pos()
+            self.profiler.begin_frame()
 
             for event in pygame.event.get():
                 if event.type == QUIT:
@@ -454,23 +824,36 @@ class Game:
                 elif event.type == KEYDOWN:
                     if event.key == K_ESCAPE: running = False
                     if event.key == K_SPACE: self.cam.rotate_view()
-                    if event.key == K_RETURN and not self.wave_active: self.start_next_level()
+                    if event.key == K_l:
+                        # Cycle lighting quality (full -> half -> quarter resolution)
+                        levels = LIGHT_QUALITY_LEVELS
+                        q = levels[(levels.index(self.light_quality) + 1) % len(levels)]
+                        self.set_light_quality(q)
+                        self.vm.add_text(SCREEN_W // 2, SCREEN_H // 2 - 150, f"LIGHTING 1/{q}", (200, 200, 255), 1.0)
+                    if event.key == K_F3: self.profiler_overlay.toggle()
+                    if event.key == K_F4:
+                        path = f"profile_{time.strftime('%Y%m%d_%H%M%S')}.csv"
+                        frames = self.profiler.dump_csv(path)
+                        self.vm.add_text(SCREEN_W // 2, SCREEN_H // 2 - 150, f"SAVED {frames} FRAMES TO {path}",
+                                         (200, 255, 200), 2.0)
+                    if event.key == K_F5 and self.input_log:
+                        path = f"replay_{time.strftime('%Y%m%d_%H%M%S')}.sqr"
+                        self.input_log.save(path, state_digest(self))
+                        self.vm.add_text(SCREEN_W // 2, SCREEN_H // 2 - 150,
+                                         f"SAVED {self.input_log.ticks} TICKS TO {path}", (200, 255, 200), 2.0)
+                    # Gameplay commands wait for the next sim tick (see apply_actions)
+                    if event.key == K_RETURN and not self.wave_active: self.pending_actions.append(("next_level",))
                     if event.key == K_r and self.game_over: self.reset_game()
-                    if event.key == K_q:
-                        if self.player.activate_ultimate():
-                            self.vm.add_text(SCREEN_W // 2, SCREEN_H // 2 - 200, "ULTIMATE ACTIVATED!", (0, 255, 255),
-                                             2.0, 30)
-                            self.cam.add_shake(20)
+                    if event.key == K_q: self.pending_actions.append(("ultimate",))
 
                 elif event.type == MOUSEBUTTONDOWN:
                     if not self.intro_active and not self.game_over and event.button == 1:
                         if not self.wave_active:
-                            for b in self.buttons: b.click(mx, my, self.player)
+                            for i, b in enumerate(self.buttons):
+                                if b.rect.collidepoint(mx, my): self.pending_actions.append(("buy", i))
                     elif not self.intro_active and event.button == 3:
                         if self.player.grenade_count > 0:
-                            m_wx, m_wy = self.cam.screen_to_world(mx, my)
-                            self.grenades.append(Grenade(self.player.wx, self.player.wy, m_wx, m_wy))
-                            self.player.grenade_count -= 1
+                            self.pending_actions.append(("grenade",) + tuple(self.cam.screen_to_world(mx, my)))
 
             if self.game_over:
                 self.draw_game_over()
@@ -499,178 +882,32 @@ class Game:
                 pygame.display.flip()
                 continue
 
-            keys = pygame.key.get_pressed()
-            if keys[K_LSHIFT]: self.player.attempt_dash()
-            input_x, input_y = 0, 0
-            if keys[K_w] or keys[K_UP]: input_y = -1
-            if keys[K_s] or keys[K_DOWN]: input_y = 1
-            if keys[K_a] or keys[K_LEFT]: input_x = -1
-            if keys[K_d] or keys[K_RIGHT]: input_x = 1
-
-            idx = self.cam.rotation_index % 4
-            vx, vy = 0, 0
-            if idx == 0:
-                vx, vy = input_x, input_y
-            elif idx == 1:
-                vx, vy = input_y, -input_x
-            elif idx == 2:
-                vx, vy = -input_x, -input_y
-            elif idx == 3:
-                vx, vy = -input_y, input_x
-
-            if vx != 0 or vy != 0:
-                l = math.hypot(vx, vy)
-                vx /= l
-                vy /= l
-                speed = self.player.stats["speed"]
-                if self.player.is_dashing: speed *= 3.0
-                self.player.vx = vx * speed
-                self.player.vy = vy * speed
-            else:
-                if not self.player.is_dashing: self.player.vx, self.player.vy = 0, 0
-
-            self.player.update(dt, self.enemies, self.bullets, self.map_grid, self.vm)
-
-            for orb in self.orbs:
-                orb.update(dt)
-                if distance(self.player.wx, self.player.wy, orb.wx, orb.wy) < 1.0:
-                    orb.lifetime = 0
-                    self.player.energy = min(self.player.max_energy, self.player.energy + 10)
-                    sx, sy = self.cam.world_to_screen(orb.wx, orb.wy)
-                    self.vm.add_particle(sx, sy, (0, 255, 255))
-            self.orbs = [o for o in self.orbs if o.lifetime > 0]
-
-            if pygame.mouse.get_pressed()[0]:
-                if self.wave_active or (my < SCREEN_H - 250):
-                    m_wx, m_wy = self.cam.screen_to_world(mx, my)
-                    new_bullets = self.player.shoot(m_wx, m_wy, self.vm)
-                    if new_bullets:
-                        self.bullets.extend(new_bullets)
-                        if not self.player.ultimate_active:
-                            self.vm.add_casing(self.player.wx, self.player.wy)
-
-            self.cam.set_target(self.player.wx, self.player.wy)
-            self.cam.update(dt)
-
-            if self.wave_active:
-                if self.enemies_spawned < self.enemies_to_spawn:
-                    self.spawn_timer -= dt
-                    if self.spawn_timer <= 0:
-                        self.spawn_enemy()
-                        self.spawn_timer = max(0.5, 2.0 - self.level * 0.1)
-                elif len(self.enemies) == 0:
-                    self.wave_active = False
-                    self.player.money += 50 * self.level
-
-            for b in self.bullets: b.update(dt)
-            self.bullets = [b for b in self.bullets if b.lifetime > 0]
-            for g in self.grenades:
-                g.update(dt, self.map_grid)
-                if g.exploded: self.handle_explosion(g.x, g.y, 80.0, 4.0)
-            self.grenades = [g for g in self.grenades if not g.exploded]
-
-            for e in self.enemies:
-                # PASS SELF.CAM HERE for earthquakes
-                e.update(dt, self.player, self.map_grid, self.bullets, self.cam)
-
-                if not self.player.is_dashing:
-                    if distance(self.player.wx, self.player.wy, e.wx, e.wy) < 0.8:
-                        self.player.health -= e.damage_to_player * dt
-                        self.damage_alpha = 150.0
-
-            if self.player.health <= 0:
-                self.game_over = True
-                sx, sy = self.cam.world_to_screen(self.player.wx, self.player.wy)
-                self.vm.add_explosion(sx, sy, (255, 0, 0))
-
-            for b in self.bullets:
-                if check_grid_collision(b.wx, b.wy, self.map_grid):
-
-                    b.lifetime = 0
-                    sx, sy = self.cam.world_to_screen(b.wx, b.wy)
-                    self.vm.add_particle(sx, sy, (200, 200, 200))
-
-                if b.owner_id != self.player.uid:
-                    if distance(self.player.wx, self.player.wy, b.wx, b.wy) < 0.6:
-                        self.player.health -= b.damage
-                        self.damage_alpha = 150.0  # Trigger red flash
-                        b.lifetime = 0  # Destroy bullet
-
-                        # Add blood effect
-                        sx, sy = self.cam.world_to_screen(self.player.wx, self.player.wy)
-                        self.vm.add_particle(sx, sy, (255, 0, 0))
-
-                for e in self.enemies:
-                    if e.uid == b.owner_id: continue
-                    if e.uid in b.hit_list: continue
-                    if distance(e.wx, e.wy, b.wx, b.wy) < 0.8:
-                        e.take_damage(b.damage)
-                        b.hit_list.append(e.uid)
-                        sx, sy = self.cam.world_to_screen(e.wx, e.wy)
-                        self.vm.add_particle(sx, sy, e.color)
-                        self.vm.add_text(sx, sy - 40, str(int(b.damage)), (255, 255, 255))
-                        e.apply_knockback(b.vx * 0.2, b.vy * 0.2)
-                        if b.pierce <= 0:
-                            b.lifetime = 0
-                            break
-                        else:
-                            b.pierce -= 1
-
-            survivors = []
-            for e in self.enemies:
-                if e.dead:
-                    self.player.money += e.money_value
-                    self.enemies_killed_in_wave += 1
-                    self.cam.add_shake(3.0)
-                    sx, sy = self.cam.world_to_screen(e.wx, e.wy)
-                    self.vm.add_text(sx, sy - 60, f"+${e.money_value}", COL_MONEY)
-                    for _ in range(8): self.vm.add_particle(sx, sy, e.color)
-
-                    if random.random() < 1:
-                        self.orbs.append(EnergyOrb(e.wx, e.wy))
-                else:
-                    survivors.append(e)
-            self.enemies = survivors
-
-            self.vm.update(dt)
-
-            self.screen.fill(COL_BG)
-            draw_floor_grid(self.screen, self.cam, MAP_W, MAP_H, self.level)
-            self.vm.draw_floor(self.screen, self.cam)
-            self.vm.draw_ghosts(self.screen, self.cam)
-
-            for orb in self.orbs: orb.draw(self.screen, self.cam)
-
-            render_list = []
-            render_list.append(self.player)
-            render_list.extend(self.enemies)
-            render_list.extend(self.walls)
-            render_list.sort(key=lambda x: self.cam.world_to_screen(x.wx, x.wy)[1])
-
-            # DRAW SHADOWS FIRST (so they are under the bodies)
-            for entity in render_list:
-                entity.draw_shadow(self.screen, self.cam)
-
-            for entity in render_list:
-                entity.draw(self.screen, self.cam)
-
-            for b in self.bullets: b.draw(self.screen, self.cam)
-            for g in self.grenades: g.draw(self.screen, self.cam)
-
-            self.vm.draw_top(self.screen, self.cam)
-            self.draw_vignette()
-
-            if self.damage_alpha > 0:
-                flash_surf = pygame.Surface((SCREEN_W, SCREEN_H))
-                flash_surf.fill((255, 0, 0))
-                flash_surf.set_alpha(int(self.damage_alpha))
-                self.screen.blit(flash_surf, (0, 0))
-                self.damage_alpha = max(0, self.damage_alpha - 300 * dt)
-
-            self.draw_hud()
-            pygame.display.flip()
+            # Fixed-step simulation: AI & collisions run exactly SIM_RATE times a
+            # second whatever the frame rate; rendering interpolates in between
+            with self.profiler.scope("input"):
+                inp = self.read_input()
+            accumulator += dt
+            steps = 0
+            while accumulator >= sim_dt and steps < MAX_SIM_STEPS:
+                self.snapshot_positions()
+                self.simulate(sim_dt, inp)
+                if inp["actions"]:
+                    inp["actions"] = self.pending_actions = []  # Applied once, on this tick
+                accumulator -= sim_dt
+                steps += 1
+                if self.game_over: break
+            if steps == MAX_SIM_STEPS:
+                # Machine can't keep up: drop the backlog instead of falling further behind
+                accumulator = min(accumulator, sim_dt)
+
+            self.render(dt, accumulator / sim_dt)
+            self.profiler.end_frame()
         pygame.quit()
 
 
 if __name__ == "__main__":
-    Game().run()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Square Up")
+    parser.add_argument("--seed", type=int, help="play a given game (random otherwise)")
+    parser.add_argument("--record", action="store_true", help="record input; F5 saves a replay (see replay.py)")
+    args = parser.parse_args()
+    Game(seed=args.seed, record=args.record).run()
@@ -1,15 +1,18 @@
 # map_gen.py
+import math
 import random
 import pygame
 from config import *
-from entities import WallBlock
+from level import LevelGrid
 
 def generate_map(w, h, seed):
-    random.seed(seed)
+    # Own generator: the same level always gets the same map, without
+    # reseeding (and so disturbing) the game's global random stream
+    rng = random.Random(seed)
     grid = [[0 for _ in range(w)] for __ in range(h)]
     for y in range(h):
         for x in range(w):
-            if random.random() < 0.1:
+            if rng.random() < 0.1:
                 grid[y][x] = 1
             else:
                 grid[y][x] = 0
@@ -17,52 +20,297 @@ def generate_map(w, h, seed):
     for y in range(cy-2, cy+3):
         for x in range(cx-2, cx+3):
             grid[y][x] = 0
-    random.seed()
-    return grid
+    return LevelGrid(grid)
 
-def create_wall_entities(grid, level):
-    walls = []
+def wall_colors(level):
     hue_shift = (level * 35) % 360
     base_col = pygame.Color(0)
     base_col.hsla = (hue_shift, 40, 40, 100)
     col_top = (min(255, base_col.r + 50), min(255, base_col.g + 50), min(255, base_col.b + 50))
     col_side = (base_col.r, base_col.g, base_col.b)
+    return col_top, col_side
 
-    for y in range(len(grid)):
-        for x in range(len(grid[0])):
-            if grid[y][x] == 1:
-                walls.append(WallBlock(x, y, col_top, col_side))
-    return walls
-
-def draw_floor_grid(surf, cam, w, h, level):
+def floor_colors(level):
     hue_shift = (level * 35) % 360
     base_col = pygame.Color(0)
     base_col.hsla = (hue_shift, 40, 20, 100) # Dark floor
     col_floor = (base_col.r, base_col.g, base_col.b)
     col_line = (max(0, base_col.r-20), max(0, base_col.g-20), max(0, base_col.b-20))
+    return col_floor, col_line
 
-    tile_w = TILE_W_BASE * cam.zoom
-    tile_h = TILE_H_BASE * cam.zoom
+def draw_floor_grid(surf, cam, w, h, level, colors=None):
+    col_floor, col_line = colors or floor_colors(level)
 
-    # Helper to project a point
-    def proj(wx, wy):
-        return cam.world_to_screen(wx, wy)
+    # Project every tile corner once (shared by up to 4 tiles) in a single batch
+    corners = cam.project_points([(x, y) for y in range(h + 1) for x in range(w + 1)])
+    row = w + 1
 
     for y in range(h):
         for x in range(w):
-            # Optimization: Rough check if tile is on screen
-            sx, sy = proj(x + 0.5, y + 0.5)
-            if sx < -100 or sx > SCREEN_W + 100 or sy < -100 or sy > SCREEN_H + 100:
-                continue
-
             # Calculate the 4 true corners of the floor tile
             # This ensures the floor matches the walls even when rotated
-            p1 = proj(x, y)
-            p2 = proj(x + 1, y)
-            p3 = proj(x + 1, y + 1)
-            p4 = proj(x, y + 1)
+            i = y * row + x
+            p1 = corners[i]
+            p2 = corners[i + 1]
+            p3 = corners[i + row + 1]
+            p4 = corners[i + row]
+
+            # Optimization: Rough check if tile is on screen (centre = midpoint of a diagonal)
+            sx = (p1[0] + p3[0]) / 2
+            sy = (p1[1] + p3[1]) / 2
+            if sx < -100 or sx > SCREEN_W + 100 or sy < -100 or sy > SCREEN_H + 100:
+                continue
 
             poly = [p1, p2, p3, p4]
 
             pygame.draw.polygon(surf, col_floor, poly)
-            pygame.draw.polygon(surf, col_line, poly, 1)
\ No newline at end of file
+            pygame.draw.polygon(surf, col_line, poly, 1)
+
+
+class FloorRenderer:
+    """
+    Caches the floor as pre-drawn chunks of FLOOR_CHUNK x FLOOR_CHUNK tiles.
+    The bake is only valid for one (level, zoom, rotation), but panning and
+    shake just move it, so a settled camera costs a few blits per frame.
+    While zooming/rotating we fall back to draw_floor_grid.
+    """
+
+    def __init__(self, w, h, chunk=FLOOR_CHUNK):
+        self.w = w
+        self.h = h
+        self.chunk = chunk
+        self.key = None
+        self.level = None
+        self.colors = None
+        self.chunks = {}  # (chunk_x, chunk_y) -> (surface, offset_x, offset_y)
+
+    def draw(self, surf, cam, level):
+        if level != self.level:
+            self.level = level
+            self.colors = floor_colors(level)
+
+        if not cam.is_settled():
+            draw_floor_grid(surf, cam, self.w, self.h, level, self.colors)
+            return
+
+        key = (level, round(cam.zoom, 3), cam.rotation_index)
+        if key != self.key:
+            self.key = key
+            self.chunks = {}
+
+        # The projection is affine: screen = origin + x * axis_x + y * axis_y
+        axis_x = (cam.m00, cam.m10)
+        axis_y = (cam.m01, cam.m11)
+        # Round the origin once, so every chunk moves by the same whole pixel (no seams)
+        ox, oy = round(cam.tx), round(cam.ty)
+
+        for cy in range(0, self.h, self.chunk):
+            for cx in range(0, self.w, self.chunk):
+                entry = self.chunks.get((cx, cy))
+                if entry is None:
+                    entry = self.bake_chunk(cx, cy, axis_x, axis_y)
+                    self.chunks[(cx, cy)] = entry
+                chunk_surf, off_x, off_y = entry
+                dx, dy = ox + off_x, oy + off_y
+                if dx > SCREEN_W or dy > SCREEN_H:
+                    continue
+                if dx + chunk_surf.get_width() < 0 or dy + chunk_surf.get_height() < 0:
+                    continue
+                surf.blit(chunk_surf, (dx, dy))
+
+    def prepare(self, cam, level):
+        """Bakes every chunk of `level` for the camera's (settled) view ahead of its first draw."""
+        self.level = level
+        self.colors = floor_colors(level)
+        self.key = (level, round(cam.zoom, 3), cam.rotation_index)
+        axis_x = (cam.m00, cam.m10)
+        axis_y = (cam.m01, cam.m11)
+        self.chunks = {(cx, cy): self.bake_chunk(cx, cy, axis_x, axis_y)
+                       for cy in range(0, self.h, self.chunk) for cx in range(0, self.w, self.chunk)}
+
+    def bake_chunk(self, cx, cy, axis_x, axis_y):
+        x_end = min(cx + self.chunk, self.w)
+        y_end = min(cy + self.chunk, self.h)
+
+        def rel(x, y):
+            return x * axis_x[0] + y * axis_y[0], x * axis_x[1] + y * axis_y[1]
+
+        corners = [rel(cx, cy), rel(x_end, cy), rel(x_end, y_end), rel(cx, y_end)]
+        min_x = math.floor(min(p[0] for p in corners)) - 1
+        min_y = math.floor(min(p[1] for p in corners)) - 1
+        max_x = math.ceil(max(p[0] for p in corners)) + 1
+        max_y = math.ceil(max(p[1] for p in corners)) + 1
+
+        chunk_surf = pygame.Surface((max_x - min_x, max_y - min_y), pygame.SRCALPHA)
+        col_floor, col_line = self.colors
+        for y in range(cy, y_end):
+            for x in range(cx, x_end):
+                poly = []
+                for px, py in ((x, y), (x + 1, y), (x + 1, y + 1), (x, y + 1)):
+                    rx, ry = rel(px, py)
+                    poly.append((rx - min_x, ry - min_y))
+                pygame.draw.polygon(chunk_surf, col_floor, poly)
+                pygame.draw.polygon(chunk_surf, col_line, poly, 1)
+        return chunk_surf, min_x, min_y
+
+
+class WallRenderer:
+    """
+    Draws every static wall block of a level (they are not entities).
+    For each view (zoom + rotation) the visible faces of all walls are
+    projected once, relative to the camera origin, and sorted by depth;
+    a frame then only shifts those polygons by the pan/shake offset.
+    A side face shared with a neighbouring wall is hidden behind that
+    block, so it is dropped. In a settled view the exposed faces of a
+    straight row of walls lie in one plane, and nothing else in the depth
+    order between them overlaps it on screen, so the row is kept as one
+    run and drawn as a single quad. Dynamic entities are slotted in
+    between walls by depth in draw(), cutting a run where they fall.
+    """
+
+    # Neighbour across each edge of a tile, edge i joins corner i and i + 1
+    EDGE_NEIGHBORS = [(0, -1), (1, 0), (0, 1), (-1, 0)]
+    CORNERS = [(0, 0), (1, 0), (1, 1), (0, 1)]
+    WALL_H = 30
+
+    def __init__(self, grid, level):
+        self.grid = grid
+        self.col_top, self.col_side = wall_colors(level)
+        self.tiles = [(x, y) for y in range(len(grid)) for x in range(len(grid[0])) if grid[y][x] == 1]
+        self.orders = {}  # rotation_index -> tiles sorted back to front (same for every zoom)
+        self.view = None
+        self.culler = None
+        self.walls = []  # (depth, [(run, rank)], top poly, wx, wy), sorted by depth
+        self.runs = []  # (back x, back y, step x, step y, wall indices): a face row, back to front
+        self.done = []  # Per run: how many of its faces were drawn this frame
+        self.wall_h = self.WALL_H
+
+    def is_wall(self, x, y):
+        return 0 <= y < len(self.grid) and 0 <= x < len(self.grid[0]) and self.grid[y][x] == 1
+
+    def sorted_tiles(self, cam):
+        dx, dy = cam.depth_x, cam.depth_y
+        if not cam.is_settled():
+            # Mid-rotation: the order depends on the exact angle. Start from the
+            # previous order (nearly sorted), which timsort handles in ~O(n)
+            self.tiles.sort(key=lambda t: (t[0] + 0.5) * dx + (t[1] + 0.5) * dy)
+            return self.tiles
+        order = self.orders.get(cam.rotation_index)
+        if order is None:
+            order = sorted(self.tiles, key=lambda t: (t[0] + 0.5) * dx + (t[1] + 0.5) * dy)
+            self.orders[cam.rotation_index] = order
+        return order
+
+    def prepare(self, cam):
+        """Builds the geometry for the camera's view (done off-screen when preloading a level)."""
+        self.view = (cam.zoom, cam.angle)
+        self.build_view(cam)
+
+    def build_view(self, cam):
+        m00, m01, m10, m11 = cam.m00, cam.m01, cam.m10, cam.m11
+
+        def rel(x, y):
+            return m00 * x + m01 * y, m10 * x + m11 * y
+
+        # Every block has the same corner nearest the viewer (lowest on screen) in a view
+        lowest = max(range(4), key=lambda i: rel(*self.CORNERS[i])[1])
+        # The two visible side faces, by edge index
+        faces = ((lowest - 1) % 4, lowest)
+
+        dx, dy = cam.depth_x, cam.depth_y
+        wall_h = self.wall_h = self.WALL_H * cam.zoom
+        tiles = self.sorted_tiles(cam)
+        walls = []
+        index = {}
+        for x, y in tiles:
+            index[(x, y)] = len(walls)
+            tops = [rel(x + cx, y + cy) for cx, cy in self.CORNERS]
+            tops = [(px, py - wall_h) for px, py in tops]
+            walls.append(((x + 0.5) * dx + (y + 0.5) * dy, [], tops, x + 0.5, y + 0.5))
+
+        # Mid-rotation rows aren't flat on screen in depth order: one run per face there
+        merge = cam.angle == cam.target_angle
+        runs = []
+        for edge in faces:
+            nx, ny = self.EDGE_NEIGHBORS[edge]
+            # Faces across this edge line up along the other axis; walk it back to front
+            fx, fy = abs(ny), abs(nx)
+            if fx * dx + fy * dy < 0:
+                fx, fy = -fx, -fy
+            # The face's back end: whichever of the edge's corners is further back along the row
+            c1, c2 = self.CORNERS[edge], self.CORNERS[(edge + 1) % 4]
+            bx, by = min(c1, c2, key=lambda c: c[0] * fx + c[1] * fy)
+            sx, sy = rel(fx, fy)
+
+            def exposed(x, y):
+                return self.is_wall(x, y) and not self.is_wall(x + nx, y + ny)
+
+            for x, y in tiles:
+                if not exposed(x, y) or (merge and exposed(x - fx, y - fy)):
+                    continue  # Hidden, or not the back end of its row
+                row = [(x, y)]
+                while merge and exposed(x + fx * len(row), y + fy * len(row)):
+                    row.append((x + fx * len(row), y + fy * len(row)))
+                px, py = rel(x + bx, y + by)
+                for rank, tile in enumerate(row):
+                    walls[index[tile]][1].append((len(runs), rank))
+                runs.append((px, py, sx, sy, [index[tile] for tile in row]))
+        self.walls = walls
+        self.runs = runs
+
+    def draw(self, surf, cam, entities, depths, culler=None):
+        """
+        Draws the walls with `entities` interleaved. `entities` must be sorted
+        back to front with their cam.depth() keys in `depths` (see DepthSorter).
+        Walls outside the culler's view are skipped.
+        """
+        self.culler = culler
+        if (cam.zoom, cam.angle) != self.view:
+            self.prepare(cam)
+        self.done = [0] * len(self.runs)
+
+        walls = self.walls
+        n = len(walls)
+        i = 0
+        for e, depth in zip(entities, depths):
+            start = i
+            while i < n and walls[i][0] < depth:
+                i += 1
+            if i > start:
+                self.draw_walls(surf, cam, start, i)
+            e.draw(surf, cam)
+        if i < n:
+            self.draw_walls(surf, cam, i, n)
+
+    def draw_walls(self, surf, cam, start, end):
+        """
+        Draws walls[start:end]. A side face is drawn with the rest of its run
+        up to the last face before `end` (where an entity goes), as one quad.
+        """
+        tx, ty = cam.tx, cam.ty
+        h = self.wall_h
+        col_side, col_top = self.col_side, self.col_top
+        walls, runs, done = self.walls, self.runs, self.done
+        culler = self.culler
+        culled = 0
+        for i in range(start, end):
+            _, faces, tops, wx, wy = walls[i]
+            if culler and not culler.contains(wx, wy, 1.0):
+                culled += 1
+                continue
+            for run, rank in faces:
+                if rank < done[run]:
+                    continue  # Already drawn as part of its run
+                px, py, sx, sy, indices = runs[run]
+                last = rank + 1
+                while last < len(indices) and indices[last] < end:
+                    last += 1
+                done[run] = last
+                ax, ay = px + sx * rank + tx, py + sy * rank + ty
+                bx, by = px + sx * last + tx, py + sy * last + ty
+                pygame.draw.polygon(surf, col_side, [(bx, by), (ax, ay), (ax, ay - h), (bx, by - h)])
+            top = [(px + tx, py + ty) for px, py in tops]
+            pygame.draw.polygon(surf, col_top, top)
+            pygame.draw.polygon(surf, (0, 0, 0), top, 1)
+        if culler:
+            culler.count("walls", end - start - culled, culled)
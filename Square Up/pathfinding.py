@@ -0,0 +1,224 @@
+# pathfinding.py
+import time
+import array
+import threading
+import collections
+from config import *
+from level import LevelGrid
+
+# ==========================================
+# SHARED FLOW FIELD (ONE BFS FOR ALL ENEMIES)
+# ==========================================
+
+class FlowField:
+    """
+    A single BFS from the player's tile over the whole map. Every walkable
+    tile stores the neighbour that is one step closer to the player, so an
+    enemy reads its next tile in O(1) instead of running its own search.
+    Only rebuilt when the player changes tile (or the map changes).
+    """
+
+    def __init__(self):
+        self.grid = None
+        self.target = None
+        self.w = 0
+        self.h = 0
+        self.stride = 0
+        # Both indexed like LevelGrid.solid (padded: (y + 1) * stride + x + 1)
+        self.dist = []       # Steps to the target, -1 = unreachable / wall
+        self.next_step = []  # Padded index of the next tile, -1 = none
+
+    def update(self, target, grid):
+        """Recompute if the target tile or the map changed. Returns True if it rebuilt."""
+        if target == self.target and grid is self.grid:
+            return False
+        self.grid = grid
+        self.target = target
+        self.build()
+        return True
+
+    def build(self):
+        grid = self.grid
+        if not isinstance(grid, LevelGrid):
+            grid = LevelGrid(grid)
+        w = self.w = grid.w
+        h = self.h = grid.h
+        stride = self.stride = grid.stride
+        solid = grid.solid
+        dist = [-1] * len(solid)
+        next_step = [-1] * len(solid)
+        # Up, Down, Left, Right. The solid border stops the search at the map edge.
+        steps = (stride, -stride, 1, -1)
+
+        tx, ty = self.target
+        if 0 <= tx < w and 0 <= ty < h:
+            start = grid.index(tx, ty)
+            dist[start] = 0
+            queue = collections.deque([start])
+            while queue:
+                current = queue.popleft()
+                d = dist[current] + 1
+                for step in steps:
+                    n = current + step
+                    # 0 is walkable. BFS reaches each tile first by a shortest path.
+                    if dist[n] == -1 and not solid[n]:
+                        dist[n] = d
+                        next_step[n] = current
+                        queue.append(n)
+
+        self.dist = dist
+        self.next_step = next_step
+
+    def next_tile(self, ix, iy):
+        """The tile to walk to from (ix, iy), or None (at target / unreachable)."""
+        if not (0 <= ix < self.w and 0 <= iy < self.h):
+            return None
+        n = self.next_step[(iy + 1) * self.stride + ix + 1]
+        if n < 0:
+            return None
+        return n % self.stride - 1, n // self.stride - 1
+
+
+# ==========================================
+# ALL-PAIRS NEXT-HOP TABLE (SMALL MAPS)
+# ==========================================
+
+NO_HOP = 0xFFFF  # Table entry for "no next tile" (at the target / unreachable)
+
+
+def build_next_hops(grid):
+    """
+    For every pair of walkable tiles, the next tile on a shortest path
+    between them: one BFS per destination (the same search, in the same
+    neighbour order, as FlowField.build). Tiles are numbered 0..n-1 in
+    padded-index order; returns (table, tile number per padded index (-1 =
+    wall), padded index per tile number), table[src * n + dst] = next tile.
+    """
+    solid, stride = grid.solid, grid.stride
+    cells = [i for i, s in enumerate(solid) if not s]
+    n = len(cells)
+    number = [-1] * len(solid)
+    for c, i in enumerate(cells):
+        number[i] = c
+    neighbours = [[number[i + step] for step in (stride, -stride, 1, -1) if not solid[i + step]] for i in cells]
+
+    table = array.array("H", [NO_HOP]) * (n * n)
+    for dst in range(n):
+        column = [NO_HOP] * n
+        seen = bytearray(n)
+        seen[dst] = 1
+        queue = [dst]
+        for current in queue:  # The list grows as we go: a BFS queue without popping
+            for nb in neighbours[current]:
+                if not seen[nb]:
+                    seen[nb] = 1
+                    column[nb] = current
+                    queue.append(nb)
+        table[dst::n] = array.array("H", column)
+        if dst % 64 == 63:
+            time.sleep(0)  # Let the game thread have the GIL now and then
+    return table, number, cells
+
+
+class NextHopTable:
+    """
+    Drop-in for FlowField on small maps: next hops between every pair of
+    walkable tiles, so next_tile() is one array read towards whatever the
+    target is, and the player changing tile costs nothing. The table
+    (uint16 tile numbers, n * n * 2 bytes) is built once per map, in a
+    background thread; until it's ready a FlowField answers instead. Both
+    give the same tiles, so when the switch happens doesn't matter.
+    Maps with more than NEXT_HOP_MAX_TILES walkable tiles only use the FlowField.
+    """
+
+    def __init__(self, background=True):
+        self.background = background
+        self.fallback = FlowField()
+        self.grid = None
+        self.target = None
+        self.built = None  # (grid it was built for, LevelGrid, table, tile numbers, padded indices)
+        self.lock = threading.Lock()  # Builds finish on their own threads; only the current map's may land
+        self.tiles = 0
+        self.build_ms = 0.0
+        self.nbytes = 0
+
+    def update(self, target, grid):
+        """Set the target (and map). Returns True if the answers changed."""
+        if grid is not self.grid:
+            with self.lock:
+                self.grid = grid
+            self.start_build(grid)
+        changed = target != self.target
+        self.target = target
+        if self.ready():
+            return changed
+        return self.fallback.update(target, grid)
+
+    def start_build(self, grid):
+        level = grid if isinstance(grid, LevelGrid) else LevelGrid(grid)
+        self.tiles = len(level.solid) - sum(level.solid)
+        if self.tiles > min(NEXT_HOP_MAX_TILES, NO_HOP):
+            return  # Too big for a table: the flow field it is
+        if self.background:
+            threading.Thread(target=self.build, args=(grid, level), daemon=True).start()
+        else:
+            self.build(grid, level)
+
+    def build(self, grid, level):
+        start = time.perf_counter()
+        table, number, cells = build_next_hops(level)
+        with self.lock:
+            if grid is not self.grid:
+                return  # The map changed while building: a newer build must not be overwritten
+            self.build_ms = (time.perf_counter() - start) * 1000.0
+            self.nbytes = table.itemsize * len(table)
+            self.built = (grid, level, table, number, cells)
+
+    def ready(self):
+        built = self.built
+        return built is not None and built[0] is self.grid
+
+    def report(self):
+        if not self.ready():
+            return f"next-hop table: not built ({self.tiles} walkable tiles)"
+        return (f"next-hop table: {self.tiles} tiles, {self.nbytes / 1024:.0f} KB, "
+                f"built in {self.build_ms:.0f} ms")
+
+    def next_hop(self, start, end):
+        """The tile after `start` on a shortest path to `end` (any two tiles), or None."""
+        built = self.built
+        if built is None or built[0] is not self.grid or end is None:
+            return None
+        _, level, table, number, cells = built
+        w, h = level.w, level.h
+        if not (0 <= start[0] < w and 0 <= start[1] < h and 0 <= end[0] < w and 0 <= end[1] < h):
+            return None
+        src = number[level.index(*start)]
+        dst = number[level.index(*end)]
+        if src < 0 or dst < 0:
+            return None
+        hop = table[src * len(cells) + dst]
+        if hop == NO_HOP:
+            return None
+        i = cells[hop]
+        return i % level.stride - 1, i // level.stride - 1
+
+    def next_tile(self, ix, iy):
+        """The tile to walk to from (ix, iy) towards the target, or None (at target / unreachable)."""
+        if not self.ready():
+            return self.fallback.next_tile(ix, iy)
+        return self.next_hop((ix, iy), self.target)
+
+    def path(self, start, end):
+        """Tiles from after `start` up to `end`, like utils.get_path_bfs ([] if unreachable)."""
+        path = []
+        current = self.next_hop(start, end)
+        while current is not None:
+            path.append(current)
+            current = self.next_hop(current, end)
+        return path
+
+
+def make_path_field():
+    """The pathfinding backend enemies share: a NextHopTable if enabled, else a FlowField."""
+    return NextHopTable() if PATH_NEXT_HOP else FlowField()
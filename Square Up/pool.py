@@ -0,0 +1,49 @@
+# pool.py
+
+# ==========================================
+# OBJECT POOL (FREE LIST)
+# ==========================================
+
+class ObjectPool:
+    """
+    Keeps released objects and hands them out again instead of allocating,
+    so bursts of bullets / effects don't churn the garbage collector.
+    Pooled classes re-initialise through reset(*args), which takes the same
+    arguments as their constructor. At most `capacity` spares are kept.
+    """
+
+    def __init__(self, cls, capacity=2000):
+        self.cls = cls
+        self.capacity = capacity
+        self.free = []
+        self.created = 0  # Objects ever constructed (for debugging)
+
+    def acquire(self, *args):
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args)
+            return obj
+        self.created += 1
+        return self.cls(*args)
+
+    def release(self, obj):
+        if len(self.free) < self.capacity:
+            self.free.append(obj)
+
+    def release_all(self, items):
+        """Releases every item and empties the list."""
+        for item in items:
+            self.release(item)
+        items.clear()
+
+    def compact(self, items, alive):
+        """Drops the items that aren't alive(item) in place, releasing them to the pool."""
+        free, capacity = self.free, self.capacity
+        j = 0
+        for item in items:
+            if alive(item):
+                items[j] = item
+                j += 1
+            elif len(free) < capacity:
+                free.append(item)
+        del items[j:]
@@ -0,0 +1,99 @@
+# preload.py
+import copy
+import threading
+import collections
+from config import *
+from map_gen import generate_map, FloorRenderer, WallRenderer
+from pathfinding import make_path_field
+
+# ==========================================
+# NEXT LEVEL, BUILT AHEAD OF TIME
+# ==========================================
+
+class PreparedLevel:
+    """
+    Everything start_next_level() swaps in for one level: the grid, wall
+    geometry and floor chunks (baked for the given camera view if it is
+    settled), the enemies' path field towards `target` and, for every
+    tile, the nearest walkable tile (where to put a player who'd be stuck
+    in a wall).
+    """
+
+    def __init__(self, level, cam, target):
+        self.level = level
+        self.grid = generate_map(MAP_W, MAP_H, level)
+        self.walls = WallRenderer(self.grid, level)
+        self.floor = FloorRenderer(MAP_W, MAP_H)
+        if cam.is_settled():
+            self.walls.prepare(cam)
+            self.floor.prepare(cam, level)
+        self.flow_field = make_path_field()
+        self.flow_field.update(target, self.grid)
+        self.nearest_open = self.find_nearest_open()
+
+    def find_nearest_open(self):
+        """Per padded tile index: the closest walkable (x, y), by an 8-way BFS from all of them."""
+        grid = self.grid
+        solid, stride = grid.solid, grid.stride
+        nearest = [None] * len(solid)
+        queue = collections.deque()
+        for y in range(grid.h):
+            for x in range(grid.w):
+                i = grid.index(x, y)
+                if not solid[i]:
+                    nearest[i] = (x, y)
+                    queue.append(i)
+        steps = (-stride - 1, -stride, -stride + 1, -1, 1, stride - 1, stride, stride + 1)
+        size = len(solid)
+        while queue:
+            i = queue.popleft()
+            for step in steps:
+                n = i + step
+                if 0 <= n < size and nearest[n] is None:
+                    nearest[n] = nearest[i]
+                    queue.append(n)
+        return nearest
+
+    def safe_spot(self, wx, wy):
+        """Centre of the walkable tile nearest (wx, wy), or the map centre if there is none."""
+        tile = None
+        if -1 <= int(wx) <= self.grid.w and -1 <= int(wy) <= self.grid.h:
+            tile = self.nearest_open[self.grid.index(int(wx), int(wy))]
+        if tile is None:
+            return MAP_W / 2, MAP_H / 2
+        return tile[0] + 0.5, tile[1] + 0.5
+
+
+class LevelPreloader:
+    """
+    Builds the next level on a background thread while the shop is open, so
+    starting it is just swapping references. take() waits for a build still
+    in progress, or builds on the spot if none was started (or it failed).
+    """
+
+    def __init__(self):
+        self.level = None
+        self.thread = None
+        self.result = None
+
+    def start(self, level, cam, target):
+        if level == self.level:
+            return  # Already on it
+        self.level = level
+        self.result = None
+        # The real camera keeps moving: build against a snapshot of it
+        self.thread = threading.Thread(target=self.build, args=(level, copy.copy(cam), target), daemon=True)
+        self.thread.start()
+
+    def build(self, level, cam, target):
+        self.result = PreparedLevel(level, cam, target)
+
+    def take(self, level, cam, target):
+        prepared = None
+        if level == self.level and self.thread:
+            self.thread.join()
+            prepared = self.result
+        self.level = None
+        self.thread = None
+        self.result = None
+        return prepared or PreparedLevel(level, cam, target)
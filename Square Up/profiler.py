@@ -0,0 +1,178 @@
+# profiler.py
+import csv
+import time
+import collections
+import pygame
+from config import *
+
+# ==========================================
+# STAGE TIMER
+# ==========================================
+
+class Scope:
+    """One reusable timed section. Returned by Profiler.scope()."""
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    """
+    Adds up wall time per named stage of the game loop:
+        with self.profiler.scope("ai"):
+            ...
+    Scopes may nest (e.g. "floor" inside "render"); each name keeps its own total.
+    Between begin_frame() / end_frame() it also records per-frame stage times
+    and counts, kept for a rolling window (averages, p99) and a longer trace
+    (CSV dump).
+    """
+
+    def __init__(self, window=PROFILER_WINDOW, trace=PROFILER_TRACE):
+        self.scopes = {}
+        self.totals = collections.defaultdict(float)  # name -> seconds
+        self.calls = collections.defaultdict(int)     # name -> times entered
+
+        self.window = window
+        self.frame = collections.defaultdict(float)   # This frame's stage seconds
+        self.counts = {}                              # This frame's counters
+        self.frame_start = None
+        self.frames = 0
+        self.frame_times = collections.deque(maxlen=window)  # ms
+        self.history = {}                             # name -> deque of ms, one per frame
+        self.trace = collections.deque(maxlen=trace)  # (frame, frame ms, stages ms, counts)
+
+    def scope(self, name):
+        scope = self.scopes.get(name)
+        if scope is None:
+            scope = self.scopes[name] = Scope(self, name)
+        return scope
+
+    def add(self, name, seconds):
+        self.totals[name] += seconds
+        self.calls[name] += 1
+        self.frame[name] += seconds
+
+    def count(self, name, value):
+        """Record a per-frame number (entities, drawn objects...)."""
+        self.counts[name] = value
+
+    def reset(self):
+        self.totals.clear()
+        self.calls.clear()
+
+    def report(self, names=None):
+        """(name, total ms, ms per call) rows, slowest first."""
+        names = names or self.totals.keys()
+        rows = []
+        for name in names:
+            total = self.totals.get(name, 0.0)
+            calls = self.calls.get(name, 0)
+            rows.append((name, total * 1000.0, total * 1000.0 / calls if calls else 0.0))
+        rows.sort(key=lambda r: r[1], reverse=True)
+        return rows
+
+    # --- PER FRAME ---
+    def begin_frame(self):
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if self.frame_start is None: return
+        frame_ms = (time.perf_counter() - self.frame_start) * 1000.0
+        self.frame_start = None
+        self.frame_times.append(frame_ms)
+
+        stages = {name: seconds * 1000.0 for name, seconds in self.frame.items()}
+        for name in stages.keys() - self.history.keys():
+            self.history[name] = collections.deque(maxlen=self.window)
+        for name, values in self.history.items():
+            values.append(stages.get(name, 0.0))  # Stages that didn't run this frame took 0
+
+        self.trace.append((self.frames, frame_ms, stages, dict(self.counts)))
+        self.frame.clear()
+        self.frames += 1
+
+    def average(self, name):
+        values = self.history.get(name)
+        return sum(values) / len(values) if values else 0.0
+
+    def frame_average(self):
+        return sum(self.frame_times) / len(self.frame_times) if self.frame_times else 0.0
+
+    def frame_percentile(self, pct):
+        """Frame time (ms) that `pct` percent of recent frames stay under."""
+        if not self.frame_times: return 0.0
+        ordered = sorted(self.frame_times)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100.0))]
+
+    def dump_csv(self, path):
+        """Write the trace, one row per frame: frame, frame_ms, stage ms..., counts..."""
+        stage_names = sorted({name for _, _, stages, _ in self.trace for name in stages})
+        count_names = sorted({name for _, _, _, counts in self.trace for name in counts})
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "frame_ms"] + [f"{n}_ms" for n in stage_names] + count_names)
+            for frame, frame_ms, stages, counts in self.trace:
+                writer.writerow([frame, f"{frame_ms:.3f}"]
+                                + [f"{stages.get(n, 0.0):.3f}" for n in stage_names]
+                                + [counts.get(n, "") for n in count_names])
+        return len(self.trace)
+
+
+# ==========================================
+# ON-SCREEN OVERLAY
+# ==========================================
+
+class ProfilerOverlay:
+    """
+    Panel listing rolling stage averages, frame time (avg / p99) and counts.
+    The text only changes every `refresh` frames, so the panel is rendered
+    to its own surface then and just blitted in between.
+    """
+
+    def __init__(self, font, stages, refresh=15):
+        self.font = font
+        self.stages = stages  # Stage names, in display order
+        self.refresh = refresh
+        self.visible = False
+        self.surf = None
+        self.age = 0
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.surf = None
+
+    def lines(self, profiler, fps):
+        lines = [f"FPS {fps:5.1f}   frame {profiler.frame_average():5.2f} ms   "
+                 f"p99 {profiler.frame_percentile(99):5.2f} ms"]
+        for name in self.stages:
+            lines.append(f"{name:<12}{profiler.average(name):7.3f} ms")
+        counts = [f"{k} {v}" for k, v in profiler.counts.items()]
+        for i in range(0, len(counts), 4):
+            lines.append("  ".join(counts[i:i + 4]))
+        return lines
+
+    def draw(self, surf, profiler, fps):
+        if not self.visible: return
+        self.age += 1
+        if self.surf is None or self.age >= self.refresh:
+            self.age = 0
+            rendered = [self.font.render(line, True, (220, 255, 220)) for line in self.lines(profiler, fps)]
+            line_h = self.font.get_linesize()
+            w = max(r.get_width() for r in rendered) + 12
+            h = line_h * len(rendered) + 10
+            self.surf = pygame.Surface((w, h), pygame.SRCALPHA)
+            self.surf.fill((0, 0, 0, 180))
+            for i, r in enumerate(rendered):
+                self.surf.blit(r, (6, 5 + i * line_h))
+        surf.blit(self.surf, (surf.get_width() - self.surf.get_width() - 10, 10))  # Top right, clear of the HUD
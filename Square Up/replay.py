@@ -0,0 +1,172 @@
+# replay.py
+"""
+Recording and replaying Square Up games. A replay is the game seed plus
+every simulation tick's input, so playing it back headless reproduces the
+game exactly: a repeatable profiling workload, or a regression test for
+the simulation (the state digest saved with it must come out the same).
+    python main.py --record                    # F5 saves replay_<time>.sqr
+    python benchmark.py --record bot.sqr       # or record the benchmark bot
+    python replay.py bot.sqr                   # replay headless, check the digest
+    python replay.py bot.sqr --render --repeat 5
+"""
+
+import argparse
+import hashlib
+import struct
+import sys
+import time
+import zlib
+
+import rng
+from config import *
+
+MAGIC = b"SQRP"
+VERSION = 1
+HEADER = struct.Struct("<4sHIH?I20s")  # magic, version, seed, sim rate, god mode, ticks, state digest
+TICK = struct.Struct("<BffffB")       # flags, move x/y, aim x/y, action count
+ACTION = struct.Struct("<Bff")        # action code, up to two arguments
+
+DASH, FIRE = 1, 2
+# Game actions (see Game.apply_actions) and how many arguments each keeps; code = index + 1
+ACTIONS = (("next_level", 0), ("ultimate", 0), ("grenade", 2), ("buy", 1))
+ACTION_CODES = {name: code for code, (name, _) in enumerate(ACTIONS, 1)}
+
+
+# ==========================================
+# INPUT LOG
+# ==========================================
+class InputLog:
+    """
+    One game's input, a packed record per simulation tick (move, aim,
+    dash / fire and any actions), saved zlib-compressed: held keys repeat
+    tick after tick, so a minute of play is a few KB.
+    """
+
+    def __init__(self, seed, god_mode=False, sim_rate=SIM_RATE):
+        self.seed = seed
+        self.god_mode = god_mode
+        self.sim_rate = sim_rate
+        self.data = bytearray()
+        self.ticks = 0
+        self.digest = bytes(20)  # state_digest() of the game when saved
+
+    def record(self, inp):
+        """
+        Appends one tick. Returns the input as it will come back on replay
+        (floats rounded to 32 bits): simulate that, so both runs match.
+        """
+        start = len(self.data)
+        actions = inp.get("actions", ())
+        flags = (DASH if inp["dash"] else 0) | (FIRE if inp["fire"] else 0)
+        self.data += TICK.pack(flags, *inp["move"], *inp["aim"], len(actions))
+        for action in actions:
+            args = (tuple(action[1:]) + (0.0, 0.0))[:2]
+            self.data += ACTION.pack(ACTION_CODES[action[0]], *args)
+        self.ticks += 1
+        return next(self.decode(self.data, start))[1]
+
+    @staticmethod
+    def decode(data, offset=0):
+        """Yields (next offset, input dict) for each tick from `offset`."""
+        while offset < len(data):
+            flags, mx, my, ax, ay, count = TICK.unpack_from(data, offset)
+            offset += TICK.size
+            actions = []
+            for _ in range(count):
+                code, a, b = ACTION.unpack_from(data, offset)
+                offset += ACTION.size
+                name, nargs = ACTIONS[code - 1]
+                actions.append((name, a, b)[:nargs + 1])
+            yield offset, {"move": (mx, my), "dash": bool(flags & DASH), "fire": bool(flags & FIRE),
+                           "aim": (ax, ay), "actions": actions}
+
+    def inputs(self):
+        for _, inp in self.decode(self.data):
+            yield inp
+
+    def save(self, path, digest):
+        self.digest = digest
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed, self.sim_rate, self.god_mode, self.ticks, digest))
+            f.write(zlib.compress(bytes(self.data), 9))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            raw = f.read()
+        magic, version, seed, sim_rate, god_mode, ticks, digest = HEADER.unpack_from(raw)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a version {VERSION} Square Up replay")
+        log = cls(seed, god_mode, sim_rate)
+        log.data = bytearray(zlib.decompress(raw[HEADER.size:]))
+        log.ticks = ticks
+        log.digest = digest
+        return log
+
+
+def state_digest(game):
+    """SHA-1 of the gameplay state: the same digest means the game went the same way."""
+    p = game.player
+    state = [game.level, game.wave_active, game.game_over, game.enemies_spawned,
+             p.wx, p.wy, p.health, p.money, p.stats, len(game.orbs), len(game.bullets),
+             [(type(e).__name__, e.wx, e.wy, e.health) for e in game.enemies],
+             rng.sim.getstate()]
+    return hashlib.sha1(repr(state).encode()).digest()
+
+
+# ==========================================
+# PLAYBACK
+# ==========================================
+def play(log, render=False):
+    """Replays the log headless; returns the Game as it ends and a benchmark-style summary."""
+    from main import Game
+    from benchmark import STAGES
+
+    if log.sim_rate != SIM_RATE:
+        raise ValueError(f"replay was recorded at {log.sim_rate} Hz, the game runs at {SIM_RATE} Hz")
+    game = Game(headless=True, seed=log.seed, god_mode=log.god_mode, deterministic=True)
+    game.intro_active = False
+    sim_dt = 1.0 / SIM_RATE
+    peaks = {"enemies": 0, "bullets": 0}
+    start = time.perf_counter()
+    for inp in log.inputs():
+        game.snapshot_positions()
+        game.simulate(sim_dt, inp)
+        if render:
+            game.render(sim_dt, 1.0)
+        else:
+            game.update_visuals(sim_dt)
+        peaks["enemies"] = max(peaks["enemies"], len(game.enemies))
+        peaks["bullets"] = max(peaks["bullets"], len(game.bullets))
+    elapsed = time.perf_counter() - start
+
+    return game, {
+        "seed": log.seed,
+        "ticks": log.ticks,
+        "waves": game.level,
+        "completed": True,
+        "seconds": elapsed,
+        "ticks_per_sec": log.ticks / elapsed if elapsed else 0.0,
+        "stages": {name: game.profiler.totals.get(name, 0.0) for name in STAGES},
+        "peaks": peaks,
+    }
+
+
+if __name__ == "__main__":
+    from benchmark import print_report
+
+    parser = argparse.ArgumentParser(description="Replay a recorded Square Up game headless")
+    parser.add_argument("path")
+    parser.add_argument("--render", action="store_true", help="also draw every tick")
+    parser.add_argument("--repeat", type=int, default=1, help="play it this many times (profiling)")
+    args = parser.parse_args()
+
+    log = InputLog.load(args.path)
+    matched = True
+    for _ in range(args.repeat):
+        game, result = play(log, args.render)
+        print_report(result)
+        same = state_digest(game) == log.digest
+        matched = matched and same
+        print("  digest " + ("matches the recording" if same else "DIFFERS: the simulation diverged"))
+    sys.exit(0 if matched else 1)
@@ -0,0 +1,26 @@
+# rng.py
+import random
+
+# ==========================================
+# RANDOM STREAMS
+# ==========================================
+# One generator per job instead of the shared global `random`, so nothing
+# can shift anyone else's numbers. Gameplay code draws from `sim` only,
+# at fixed simulation ticks, so a seed plus the recorded input replays a
+# game exactly (see replay.py). Cosmetic code draws from `fx`, which may
+# run per rendered frame and so differs between machines; maps come from
+# their own Random in map_gen.generate_map.
+
+sim = random.Random()  # Spawns, enemy behaviour, weapon spread, drops
+fx = random.Random()   # Particles, decals, debris, screen shake
+
+
+def seed(value):
+    """Restart every stream from one game seed."""
+    sim.seed(f"sim-{value}")
+    fx.seed(f"fx-{value}")
+
+
+def new_seed():
+    """A fresh game seed (fits the replay header's 32 bits)."""
+    return random.SystemRandom().getrandbits(32)
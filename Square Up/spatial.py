@@ -0,0 +1,187 @@
+# spatial.py
+import math
+from utils import distance
+
+# ==========================================
+# SPATIAL HASH (UNIFORM GRID)
+# ==========================================
+
+class SpatialHash:
+    """
+    Buckets objects by the integer tile they stand on, i.e. the same
+    (int(wx), int(wy)) cells as map_grid. A query only looks at the few
+    tiles around a point instead of every object in the level.
+    Anything with .wx / .wy can be stored (world coords are never negative).
+    Either rebuild() it from scratch, or keep it up to date incrementally
+    with insert / remove / move, or sync() once per tick.
+    """
+
+    def __init__(self):
+        self.cells = {}
+        self.where = {}  # Item -> the cell it's filed under
+        self.count = 0
+
+    def rebuild(self, items):
+        cells = {}
+        where = {}
+        for item in items:
+            key = where[item] = (int(item.wx), int(item.wy))
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [item]
+            else:
+                bucket.append(item)
+        self.cells = cells
+        self.where = where
+        self.count = len(where)
+
+    # --- INCREMENTAL ---
+    def insert(self, item):
+        key = self.where[item] = (int(item.wx), int(item.wy))
+        bucket = self.cells.get(key)
+        if bucket is None:
+            self.cells[key] = [item]
+        else:
+            bucket.append(item)
+        self.count += 1
+
+    def remove(self, item):
+        key = self.where.pop(item, None)
+        if key is None: return
+        bucket = self.cells[key]
+        bucket.remove(item)  # A tile holds a handful at most
+        if not bucket:
+            del self.cells[key]
+        self.count -= 1
+
+    def move(self, item):
+        """Re-files an item (inserting it if new); only does work when it changed tile."""
+        old = self.where.get(item)
+        if old is not None:
+            if old == (int(item.wx), int(item.wy)):
+                return
+            self.remove(item)
+        self.insert(item)
+
+    def sync(self, items):
+        """
+        Matches the index to `items` after they moved: only items that
+        changed tile are re-filed, new ones added, missing ones dropped.
+        """
+        where = self.where
+        for item in items:
+            old = where.get(item)
+            if old is None or old[0] != int(item.wx) or old[1] != int(item.wy):
+                self.move(item)
+        if self.count > len(items):
+            present = set(items)
+            for item in [item for item in where if item not in present]:
+                self.remove(item)
+
+    def query(self, wx, wy, radius):
+        """Candidates in every tile touched by the square around (wx, wy). No distance check."""
+        cells = self.cells
+        found = []
+        x0, x1 = int(math.floor(wx - radius)), int(math.floor(wx + radius))
+        y0, y1 = int(math.floor(wy - radius)), int(math.floor(wy + radius))
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(cells):
+            # Big radius, few occupied tiles: cheaper to walk the occupied ones
+            for (ix, iy), bucket in cells.items():
+                if x0 <= ix <= x1 and y0 <= iy <= y1:
+                    found.extend(bucket)
+            return found
+        for iy in range(y0, y1 + 1):
+            for ix in range(x0, x1 + 1):
+                bucket = cells.get((ix, iy))
+                if bucket:
+                    found.extend(bucket)
+        return found
+
+    def query_radius(self, wx, wy, radius):
+        """Objects strictly closer than radius to (wx, wy)."""
+        return [o for o in self.query(wx, wy, radius) if distance(wx, wy, o.wx, o.wy) < radius]
+
+    def nearest(self, wx, wy, max_dist):
+        """Closest object within max_dist, or None. Searches outwards ring by ring."""
+        cells = self.cells
+        cx, cy = int(math.floor(wx)), int(math.floor(wy))
+        closest = None
+        min_d = max_dist
+        rings = int(math.ceil(max_dist)) + 1
+        if len(cells) * 4 < (2 * rings - 1) ** 2:
+            # Nearly empty level: walking the occupied tiles beats walking rings
+            for bucket in cells.values():
+                for o in bucket:
+                    d = distance(wx, wy, o.wx, o.wy)
+                    if d < min_d:
+                        min_d = d
+                        closest = o
+            return closest
+        for ring in range(rings):
+            # Everything in this ring or further out is at least (ring - 1) away
+            if ring - 1 >= min_d:
+                break
+            for iy in range(cy - ring, cy + ring + 1):
+                edge_row = iy == cy - ring or iy == cy + ring
+                step = 1 if edge_row else 2 * ring
+                for ix in range(cx - ring, cx + ring + 1, step or 1):
+                    bucket = cells.get((ix, iy))
+                    if not bucket:
+                        continue
+                    for o in bucket:
+                        d = distance(wx, wy, o.wx, o.wy)
+                        if d < min_d:
+                            min_d = d
+                            closest = o
+        return closest
+
+
+# ==========================================
+# BROADPHASE (ONE GRID PER CATEGORY)
+# ==========================================
+
+class Broadphase:
+    """
+    Every "what is within r of here?" question in the game, by category
+    ("enemy", "orb", "player"...), each category its own incrementally
+    kept SpatialHash:
+        broadphase.sync("enemy", self.enemies)   # after they move
+        broadphase.query_radius("orb", px, py, 1.0)
+    """
+
+    def __init__(self, categories=()):
+        self.layers = {}
+        for category in categories:
+            self.layer(category)
+
+    def layer(self, category):
+        index = self.layers.get(category)
+        if index is None:
+            index = self.layers[category] = SpatialHash()
+        return index
+
+    def sync(self, category, items):
+        self.layer(category).sync(items)
+
+    def insert(self, category, item):
+        self.layer(category).insert(item)
+
+    def remove(self, category, item):
+        self.layer(category).remove(item)
+
+    def move(self, category, item):
+        self.layer(category).move(item)
+
+    def query(self, category, wx, wy, radius):
+        """Candidates (no distance check) of one category around (wx, wy)."""
+        return self.layer(category).query(wx, wy, radius)
+
+    def query_radius(self, category, wx, wy, radius):
+        """Objects of one category strictly closer than radius to (wx, wy)."""
+        return self.layer(category).query_radius(wx, wy, radius)
+
+    def nearest(self, category, wx, wy, max_dist):
+        return self.layer(category).nearest(wx, wy, max_dist)
+
+    def count(self, category):
+        return self.layer(category).count
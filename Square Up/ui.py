@@ -1,5 +1,6 @@
 # ui.py
 import pygame
+from visuals import text_cache
 
 
 class Button:
@@ -33,21 +34,25 @@ class Button:
         pygame.draw.rect(surf, col_bg, self.rect)
         pygame.draw.rect(surf, col_border, self.rect, 2)
 
-        lbl_name = font.render(f"{self.text}", True, col_text)
-        lbl_cost = font.render(f"${cost} | {val_str}", True, (200, 200, 100) if is_active else (100, 100, 100))
+        lbl_name = text_cache.render(font, f"{self.text}", col_text)
+        lbl_cost = text_cache.render(font, f"${cost} | {val_str}", (200, 200, 100) if is_active else (100, 100, 100))
 
         surf.blit(lbl_name, (self.rect.x + 10, self.rect.y + 5))
         surf.blit(lbl_cost, (self.rect.x + 10, self.rect.y + 25))
 
     def click(self, mx, my, player):
-        # Check condition before clicking
+        if self.rect.collidepoint(mx, my):
+            return self.buy(player)
+        return False
+
+    def buy(self, player):
+        # Check condition before buying
         if self.condition_fn and not self.condition_fn():
             return False
 
-        if self.rect.collidepoint(mx, my):
-            cost, _ = self.cost_fn()
-            if player.money >= cost:
-                player.money -= cost
-                self.callback(player)
-                return True
+        cost, _ = self.cost_fn()
+        if player.money >= cost:
+            player.money -= cost
+            self.callback(player)
+            return True
         return False
\ No newline at end of file
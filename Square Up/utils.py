@@ -26,21 +26,68 @@ def check_grid_collision(wx, wy, grid):
     return False
 
 def has_line_of_sight(x1, y1, x2, y2, grid):
-    """Raycast to check if two points can see each other."""
-    dist = math.hypot(x2 - x1, y2 - y1)
-    # Check every 0.5 world units
-    steps = int(dist * 2)
-    if steps < 1:
-        return True
+    """
+    Raycast to check if two points can see each other.
+    Exact grid traversal (Amanatides & Woo): walks every tile the segment
+    crosses exactly once, so it can't slip past a wall corner.
+    """
+    w = len(grid[0])
+    h = len(grid)
+    ix, iy = int(x1), int(y1)
+    end_x, end_y = int(x2), int(y2)
+    dx = x2 - x1
+    dy = y2 - y1
+
+    # For each axis: which way we step, the ray "time" t (0..1) to cross one
+    # whole tile, and the t of the first tile border we hit
+    step_x = 1 if dx > 0 else -1
+    step_y = 1 if dy > 0 else -1
+    if dx != 0:
+        t_delta_x = abs(1.0 / dx)
+        t_max_x = ((ix + 1 - x1) if dx > 0 else (x1 - ix)) * t_delta_x
+    else:
+        t_delta_x = t_max_x = math.inf
+    if dy != 0:
+        t_delta_y = abs(1.0 / dy)
+        t_max_y = ((iy + 1 - y1) if dy > 0 else (y1 - iy)) * t_delta_y
+    else:
+        t_delta_y = t_max_y = math.inf
 
-    for i in range(1, steps + 1):
-        t = i / steps
-        cx = x1 + (x2 - x1) * t
-        cy = y1 + (y2 - y1) * t
-        if check_grid_collision(cx, cy, grid):
+    if ix < 0 or ix >= w or iy < 0 or iy >= h or grid[iy][ix] == 1:
+        return False
+    # One step per tile border between the two end tiles
+    for _ in range(abs(end_x - ix) + abs(end_y - iy)):
+        if t_max_x < t_max_y:
+            ix += step_x
+            t_max_x += t_delta_x
+        else:
+            iy += step_y
+            t_max_y += t_delta_y
+        if ix < 0 or ix >= w or iy < 0 or iy >= h or grid[iy][ix] == 1:
             return False
     return True
 
+class SightCache:
+    """
+    Line of sight answers for one tick, keyed by (from tile, to tile).
+    Enemies standing on the same tile share one raycast (tile centre to
+    tile centre). Call clear() once per tick.
+    """
+
+    def __init__(self):
+        self.results = {}
+
+    def clear(self):
+        self.results.clear()
+
+    def check(self, x1, y1, x2, y2, grid):
+        key = (int(x1), int(y1), int(x2), int(y2))
+        result = self.results.get(key)
+        if result is None:
+            result = has_line_of_sight(key[0] + 0.5, key[1] + 0.5, key[2] + 0.5, key[3] + 0.5, grid)
+            self.results[key] = result
+        return result
+
 # ==========================================
 # PATHFINDING (BFS)
 # ==========================================
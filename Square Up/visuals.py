@@ -1,25 +1,115 @@
 # visuals.py
 import pygame
-import random
+import rng
 import math
+import collections
 from config import *
+from pool import ObjectPool
+
+
+# ==========================================
+# ALPHA SPRITE CACHE
+# ==========================================
+class SpriteCache:
+    """
+    Reuses small SRCALPHA surfaces across frames and entities instead of
+    allocating one per draw. Keyed by (shape, radius bucket, colour, alpha
+    bucket); radius snaps to whole pixels and alpha to steps of `alpha_step`.
+    """
+
+    def __init__(self, capacity=256, alpha_step=16):
+        self.capacity = capacity
+        self.alpha_step = alpha_step
+        self.sprites = collections.OrderedDict()
+
+    def circle(self, radius, color, alpha):
+        """A (2r x 2r) surface with a filled, translucent circle in the middle."""
+        r = max(1, int(round(radius)))
+        a = min(255, int(alpha) // self.alpha_step * self.alpha_step)
+        key = ("circle", r, color, a)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = pygame.Surface((r * 2, r * 2), pygame.SRCALPHA)
+            pygame.draw.circle(sprite, (*color, a), (r, r), r)
+            self.sprites[key] = sprite
+            if len(self.sprites) > self.capacity:
+                self.sprites.popitem(last=False)
+        else:
+            self.sprites.move_to_end(key)
+        return sprite
+
+
+# Shared by every entity/effect that draws alpha circles
+sprite_cache = SpriteCache()
+
+
+# ==========================================
+# TEXT RENDER CACHE
+# ==========================================
+class TextCache:
+    """
+    LRU of rendered text surfaces keyed by (font, text, colour), so a string
+    is only rasterised again when its value changes. Outlined text (label
+    over a black copy shifted 1px) is composited once per entry.
+    """
+
+    def __init__(self, capacity=512):
+        self.capacity = capacity
+        self.surfaces = collections.OrderedDict()
+
+    def lookup(self, key):
+        surf = self.surfaces.get(key)
+        if surf is not None:
+            self.surfaces.move_to_end(key)
+        return surf
+
+    def store(self, key, surf):
+        self.surfaces[key] = surf
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+        return surf
+
+    def render(self, font, text, color):
+        key = (font, text, color)
+        return self.lookup(key) or self.store(key, font.render(text, True, color))
+
+    def render_outlined(self, font, text, color, outline=(0, 0, 0), offset=1):
+        key = (font, text, color, outline, offset)
+        surf = self.lookup(key)
+        if surf is None:
+            lbl = font.render(text, True, color)
+            shadow = font.render(text, True, outline)
+            surf = pygame.Surface((lbl.get_width() + offset, lbl.get_height() + offset), pygame.SRCALPHA)
+            surf.blit(shadow, (offset, offset))
+            surf.blit(lbl, (0, 0))
+            self.store(key, surf)
+        return surf
+
+
+# Shared by floating texts, the HUD and the shop buttons
+text_cache = TextCache()
 
 
 class CrackDecal:
     """Jagged lines that appear on impact"""
+    __slots__ = ("wx", "wy", "color", "lifetime", "points")
 
     def __init__(self, wx, wy, color):
+        self.points = []
+        self.reset(wx, wy, color)
+
+    def reset(self, wx, wy, color):
         self.wx = wx
         self.wy = wy
         self.color = color
         self.lifetime = 5.0  # Lasts 5 seconds
-        self.points = []
+        self.points.clear()
 
         # Generate 3-5 jagged lines radiating from center
-        num_branches = random.randint(3, 5)
+        num_branches = rng.fx.randint(3, 5)
         for _ in range(num_branches):
-            angle = random.uniform(0, 6.28)
-            length = random.uniform(1.5, 3.0)  # Length in world units
+            angle = rng.fx.uniform(0, 6.28)
+            length = rng.fx.uniform(1.5, 3.0)  # Length in world units
 
             # Start at center
             branch = [(0, 0)]
@@ -27,11 +117,11 @@ class CrackDecal:
 
             # Create jagged segments
             while curr_dist < length:
-                step = random.uniform(0.3, 0.6)
+                step = rng.fx.uniform(0.3, 0.6)
                 curr_dist += step
 
                 # Wiggle the angle slightly for "jagged" look
-                wiggled_angle = angle + random.uniform(-0.5, 0.5)
+                wiggled_angle = angle + rng.fx.uniform(-0.5, 0.5)
 
                 # Calculate offset relative to center
                 px = branch[-1][0] + math.cos(wiggled_angle) * step
@@ -61,12 +151,8 @@ class CrackDecal:
             )
 
             for branch in self.points:
-                # Convert relative points to screen points
-                screen_points = []
-                for pt in branch:
-                    wx = self.wx + pt[0]
-                    wy = self.wy + pt[1]
-                    screen_points.append(cam.world_to_screen(wx, wy))
+                # Convert relative points to screen points (one batch per branch)
+                screen_points = cam.project_points([(self.wx + pt[0], self.wy + pt[1]) for pt in branch])
 
                 if len(screen_points) > 1:
                     pygame.draw.lines(surf, fade_col, False, screen_points, max(1, int(2 * cam.zoom)))
@@ -74,8 +160,12 @@ class CrackDecal:
 
 class GhostTrace:
     """Visual echo of the player when dashing"""
+    __slots__ = ("wx", "wy", "color", "radius", "alpha", "lifetime")
 
     def __init__(self, wx, wy, color, radius):
+        self.reset(wx, wy, color, radius)
+
+    def reset(self, wx, wy, color, radius):
         self.wx = wx
         self.wy = wy
         self.color = color
@@ -90,46 +180,113 @@ class GhostTrace:
     def draw(self, surf, cam):
         if self.lifetime > 0:
             sx, sy = cam.world_to_screen(self.wx, self.wy)
-            s = pygame.Surface((self.radius * 2 * cam.zoom + 10, self.radius * 2 * cam.zoom + 10), pygame.SRCALPHA)
+            s = sprite_cache.circle(self.radius * cam.zoom, self.color, self.alpha)
             cx, cy = s.get_width() // 2, s.get_height() // 2
-            r_scaled = self.radius * cam.zoom
-            pygame.draw.circle(s, (*self.color, self.alpha), (cx, cy), r_scaled)
             surf.blit(s, (sx - cx, sy - cy - (15 * cam.zoom)))
 
 
-class Particle:
-    def __init__(self, x, y, color, speed, lifetime, size_start):
-        self.x = x
-        self.y = y
-        angle = random.uniform(0, 6.28)
-        self.vx = math.cos(angle) * speed
-        self.vy = math.sin(angle) * speed * 0.6
-        self.color = color
-        self.lifetime = lifetime
-        self.max_life = lifetime
-        self.size = size_start
+class ParticlePool:
+    """
+    Screen-space particles stored as a structure of arrays: one preallocated
+    list per field, `count` live entries packed at the front. A dead particle
+    is removed by moving the last live one into its slot (swap-remove), so
+    nothing is allocated or rebuilt per frame. At `capacity` the oldest
+    particle is overwritten, found in O(1) from a queue of spawn serials.
+    """
+
+    def __init__(self, capacity=MAX_PARTICLES):
+        self.capacity = capacity
+        self.count = 0
+        self.serial = 0  # Spawn counter, used to find the oldest particle
+        self.order = collections.deque()  # Serials in spawn order; dead ones are dropped lazily
+        self.slot_of = {}  # Serial of each live particle -> its slot
+        self.x = [0.0] * capacity
+        self.y = [0.0] * capacity
+        self.vx = [0.0] * capacity
+        self.vy = [0.0] * capacity
+        self.life = [0.0] * capacity
+        self.max_life = [1.0] * capacity
+        self.size = [0.0] * capacity
+        self.color = [(0, 0, 0)] * capacity
+        self.born = [0] * capacity
+
+    def __len__(self):
+        return self.count
+
+    def spawn(self, x, y, color, speed, lifetime, size_start):
+        order, slot_of = self.order, self.slot_of
+        while order and order[0] not in slot_of:
+            order.popleft()
+        if self.count < self.capacity:
+            i = self.count
+            self.count += 1
+        else:
+            # Full: evict the oldest (the queue's head is alive now)
+            i = slot_of.pop(order.popleft())
+        angle = rng.fx.uniform(0, 6.28)
+        self.x[i] = x
+        self.y[i] = y
+        self.vx[i] = math.cos(angle) * speed
+        self.vy[i] = math.sin(angle) * speed * 0.6
+        self.color[i] = color
+        self.life[i] = lifetime
+        self.max_life[i] = lifetime
+        self.size[i] = size_start
+        self.born[i] = self.serial
+        slot_of[self.serial] = i
+        order.append(self.serial)
+        self.serial += 1
 
     def update(self, dt):
-        self.x += self.vx * dt
-        self.y += self.vy * dt
-        self.lifetime -= dt
-        self.size = max(0, self.size - (self.size / self.max_life) * dt)
+        xs, ys, vxs, vys = self.x, self.y, self.vx, self.vy
+        life, max_life, size = self.life, self.max_life, self.size
+        i = 0
+        while i < self.count:
+            life[i] -= dt
+            if life[i] <= 0:
+                self.remove(i)
+                continue  # Slot i now holds the particle moved from the end
+            xs[i] += vxs[i] * dt
+            ys[i] += vys[i] * dt
+            size[i] = max(0, size[i] - (size[i] / max_life[i]) * dt)
+            i += 1
+
+    def remove(self, i):
+        last = self.count - 1
+        del self.slot_of[self.born[i]]
+        if i != last:
+            for field in (self.x, self.y, self.vx, self.vy, self.life, self.max_life,
+                          self.size, self.color, self.born):
+                field[i] = field[last]
+            self.slot_of[self.born[i]] = i
+        self.count = last
+
+    def lights(self, min_size):
+        """(x, y, size) of every particle bigger than min_size (used by the lighting pass)."""
+        xs, ys, size = self.x, self.y, self.size
+        return [(xs[i], ys[i], size[i]) for i in range(self.count) if size[i] > min_size]
 
     def draw(self, surf):
-        if self.lifetime > 0:
-            pygame.draw.circle(surf, self.color, (int(self.x), int(self.y)), int(self.size))
+        xs, ys, size, color = self.x, self.y, self.size, self.color
+        for i in range(self.count):
+            pygame.draw.circle(surf, color[i], (int(xs[i]), int(ys[i])), int(size[i]))
 
 
 class ShellCasing:
+    __slots__ = ("wx", "wy", "z", "vx", "vy", "vz", "lifetime", "bounces")
+
     def __init__(self, wx, wy):
+        self.reset(wx, wy)
+
+    def reset(self, wx, wy):
         self.wx = wx
         self.wy = wy
         self.z = 1.0
-        angle = random.uniform(0, 6.28)
-        speed = random.uniform(2.0, 4.0)
+        angle = rng.fx.uniform(0, 6.28)
+        speed = rng.fx.uniform(2.0, 4.0)
         self.vx = math.cos(angle) * speed
         self.vy = math.sin(angle) * speed
-        self.vz = random.uniform(8.0, 12.0)
+        self.vz = rng.fx.uniform(8.0, 12.0)
         self.lifetime = 10.0
         self.bounces = 0
 
@@ -162,11 +319,16 @@ class ShellCasing:
 
 
 class Debris:
+    __slots__ = ("wx", "wy", "type", "scale", "color", "lifetime")
+
     def __init__(self, wx, wy, d_type, level_color):
+        self.reset(wx, wy, d_type, level_color)
+
+    def reset(self, wx, wy, d_type, level_color):
         self.wx = wx
         self.wy = wy
         self.type = d_type
-        self.scale = random.uniform(0.8, 1.2)
+        self.scale = rng.fx.uniform(0.8, 1.2)
         self.color = level_color
         self.lifetime = 10.0
 
@@ -184,7 +346,12 @@ class Debris:
 
 
 class FloatingText:
+    __slots__ = ("x", "y", "text", "color", "duration", "timer", "vy", "size")
+
     def __init__(self, x, y, text, color, duration=1.0, size=20):
+        self.reset(x, y, text, color, duration, size)
+
+    def reset(self, x, y, text, color, duration=1.0, size=20):
         self.x = x
         self.y = y
         self.text = text
@@ -201,20 +368,41 @@ class FloatingText:
     def draw(self, surf, font_dict):
         if self.timer < self.duration:
             font = font_dict.get(self.size, font_dict[20])
-            lbl = font.render(self.text, True, self.color)
-            outline = font.render(self.text, True, (0, 0, 0))
-            surf.blit(outline, (self.x - lbl.get_width() // 2 + 1, self.y + 1))
-            surf.blit(lbl, (self.x - lbl.get_width() // 2, self.y))
+            lbl = text_cache.render_outlined(font, self.text, self.color)
+            surf.blit(lbl, (self.x - (lbl.get_width() - 1) // 2, self.y))
+
+
+def update_and_compact(items, dt, alive, pool):
+    """Updates every item, then drops the dead ones in place (keeps order, no new list)."""
+    for item in items:
+        item.update(dt)
+    pool.compact(items, alive)
+
+
+def append_capped(items, item, cap, pool):
+    """Appends, evicting the oldest entries (front of the list) past the cap."""
+    items.append(item)
+    if len(items) > cap:
+        evicted = len(items) - cap
+        for old in items[:evicted]:
+            pool.release(old)
+        del items[:evicted]
 
 
 class VisualManager:
     def __init__(self):
-        self.particles = []
+        self.particles = ParticlePool(MAX_PARTICLES)
         self.texts = []
         self.casings = []
         self.debris = []
         self.ghosts = []
         self.cracks = []  # NEW: Jagged cracks
+        # Dead effects are recycled instead of reallocated
+        self.text_pool = ObjectPool(FloatingText, MAX_DECALS)
+        self.casing_pool = ObjectPool(ShellCasing, MAX_DECALS)
+        self.debris_pool = ObjectPool(Debris, MAX_DECALS)
+        self.ghost_pool = ObjectPool(GhostTrace, MAX_DECALS)
+        self.crack_pool = ObjectPool(CrackDecal, MAX_DECALS)
         self.fonts = {
             16: pygame.font.SysFont("Consolas", 16, bold=True),
             20: pygame.font.SysFont("Verdana", 20, bold=True),
@@ -222,55 +410,52 @@ class VisualManager:
         }
 
     def add_particle(self, x, y, color):
-        p = Particle(x, y, color, random.uniform(20, 100), random.uniform(0.3, 0.8), random.uniform(3, 6))
-        self.particles.append(p)
+        self.particles.spawn(x, y, color, rng.fx.uniform(20, 100), rng.fx.uniform(0.3, 0.8), rng.fx.uniform(3, 6))
 
     def add_explosion(self, x, y, color=(255, 100, 50)):
         for _ in range(15):
-            p = Particle(x, y, color, random.uniform(50, 150), random.uniform(0.5, 1.0), random.uniform(5, 10))
-            self.particles.append(p)
+            self.particles.spawn(x, y, color, rng.fx.uniform(50, 150), rng.fx.uniform(0.5, 1.0), rng.fx.uniform(5, 10))
         for _ in range(5):
-            p = Particle(x, y, (100, 100, 100), random.uniform(20, 80), 1.5, 8)
-            self.particles.append(p)
+            self.particles.spawn(x, y, (100, 100, 100), rng.fx.uniform(20, 80), 1.5, 8)
 
     def add_text(self, x, y, msg, color=(255, 255, 255), duration=1.0, size=20):
-        self.texts.append(FloatingText(x, y, msg, color, duration, size))
+        append_capped(self.texts, self.text_pool.acquire(x, y, msg, color, duration, size), MAX_DECALS,
+                      self.text_pool)
 
     def add_casing(self, wx, wy):
-        self.casings.append(ShellCasing(wx, wy))
+        append_capped(self.casings, self.casing_pool.acquire(wx, wy), MAX_DECALS, self.casing_pool)
 
     def add_debris(self, wx, wy, d_type, col=(100, 100, 100)):
-        self.debris.append(Debris(wx, wy, d_type, col))
+        append_capped(self.debris, self.debris_pool.acquire(wx, wy, d_type, col), MAX_DECALS, self.debris_pool)
 
     def add_ghost(self, wx, wy, color, radius):
-        self.ghosts.append(GhostTrace(wx, wy, color, radius))
+        append_capped(self.ghosts, self.ghost_pool.acquire(wx, wy, color, radius), MAX_DECALS, self.ghost_pool)
 
     def add_crack(self, wx, wy, color=(200, 200, 200)):
-        self.cracks.append(CrackDecal(wx, wy, color))
+        append_capped(self.cracks, self.crack_pool.acquire(wx, wy, color), MAX_DECALS, self.crack_pool)
 
     def update(self, dt):
-        for p in self.particles: p.update(dt)
-        for t in self.texts: t.update(dt)
-        for c in self.casings: c.update(dt)
-        for d in self.debris: d.update(dt)
-        for g in self.ghosts: g.update(dt)
-        for k in self.cracks: k.update(dt)
-
-        self.particles = [p for p in self.particles if p.lifetime > 0]
-        self.texts = [t for t in self.texts if t.timer < t.duration]
-        self.casings = [c for c in self.casings if c.lifetime > 0]
-        self.debris = [d for d in self.debris if d.lifetime > 0]
-        self.ghosts = [g for g in self.ghosts if g.lifetime > 0]
-        self.cracks = [k for k in self.cracks if k.lifetime > 0]
-
-    def draw_floor(self, surf, cam):
-        for d in self.debris: d.draw(surf, cam)
-        for k in self.cracks: k.draw(surf, cam)  # Draw cracks on floor
-
-    def draw_ghosts(self, surf, cam):
-        for g in self.ghosts: g.draw(surf, cam)
-
-    def draw_top(self, surf, cam):
-        for c in self.casings: c.draw(surf, cam)
-        for p in self.particles: p.draw(surf)
+        self.particles.update(dt)
+        update_and_compact(self.texts, dt, lambda t: t.timer < t.duration, self.text_pool)
+        for items, pool in ((self.casings, self.casing_pool), (self.debris, self.debris_pool),
+                            (self.ghosts, self.ghost_pool), (self.cracks, self.crack_pool)):
+            update_and_compact(items, dt, lambda o: o.lifetime > 0, pool)
+
+    # The culler (culling.Culler) is optional: without it everything is drawn
+    def draw_floor(self, surf, cam, culler=None):
+        debris, cracks = self.debris, self.cracks
+        if culler:
+            debris = culler.visible(debris, "debris", 0.5)
+            cracks = culler.visible(cracks, "cracks", 3.0)  # Branches reach ~3 tiles out
+        for d in debris: d.draw(surf, cam)
+        for k in cracks: k.draw(surf, cam)  # Draw cracks on floor
+
+    def draw_ghosts(self, surf, cam, culler=None):
+        ghosts = culler.visible(self.ghosts, "ghosts", 1.0) if culler else self.ghosts
+        for g in ghosts: g.draw(surf, cam)
+
+    def draw_top(self, surf, cam, culler=None):
+        casings = culler.visible(self.casings, "casings", 0.5) if culler else self.casings
+        for c in casings: c.draw(surf, cam)
+        self.particles.draw(surf)
         for t in self.texts: t.draw(surf, self.fonts)
\ No newline at end of file